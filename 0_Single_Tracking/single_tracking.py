@@ -4,20 +4,34 @@
 # Este código demonstra como usar o OpenCV para realizar o rastreamento de objeto em uma sequência de vídeo.
 # O código utiliza a função `tracker.init()` para criar um objeto tracker,
 # que pode ser usado para rastrear o objeto em um vídeo.
+#
+# Modo offline (sem interface gráfica), útil para processar vídeos arquivados em servidores:
+#   python 0_Single_Tracking/single_tracking.py --offline --bbox 100 150 60 120 --video videos/race.mp4 --csv saida.csv
+#
+# Nos dois modos, `--output` grava o vídeo anotado em uma thread separada (`AsyncVideoWriter`), por exemplo gravando
+# um de cada 2 frames:
+#   python 0_Single_Tracking/single_tracking.py --output saida.mp4 --output-every 2
 # -------------------------------------------------------------------------------------------------------------------------------#
 
 # -------------------------------------------------------------------------------------------------------------------------------#
 # Importar as bibliotecas necessárias
+import argparse
+import itertools
+import os
 import cv2
 import sys
+import time
 from random import randint
 
-(major_ver, minor_ver, subminor_ver) = (cv2.__version__).split('.')
-#print(major_ver, minor_ver, subminor_ver)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from rastreamento.engine import track_video
+from rastreamento.prefetch import FramePrefetcher
+from rastreamento.trackers import create_tracker, tracker_types
+from rastreamento.video_writer import AsyncVideoWriter
 
 # Definir os tipos de rastreadores
 
-# O código define uma lista de tipos de rastreadores que podem ser usados pelo objeto multitracker. Esses tipos incluem:
+# Os tipos de rastreadores disponíveis ficam no registro compartilhado `rastreamento/trackers.py`. Esses tipos incluem:
 # `BOOSTING`
 # `MIL`
 # `KCF`
@@ -25,38 +39,106 @@ from random import randint
 # `MEDIANFLOW`
 # `MOSSE`
 # `CSRT`
-tracker_types = ['BOOSTING', 'MIL', 'KCF', 'TLD', 'MEDIANFLOW', 'MOSSE', 'CSRT']
-tracker_type = tracker_types[1]
+# `GOTURN`
 
 # -------------------------------------------------------------------------------------------------------------------------------#
-# Condição para criar o rastreador
-if int(minor_ver) < 3:
-    tracker = tracker_type
-else:
-   if tracker_type == 'BOOSTING':
-       tracker = cv2.legacy.TrackerBoosting_create()
-   if tracker_type == 'MIL':
-       tracker = cv2.TrackerMIL_create()
-   if tracker_type == 'KCF':
-       tracker = cv2.TrackerKCF_create()
-   if tracker_type == 'TLD':
-       tracker = cv2.legacy.TrackerTLD_create()
-   if tracker_type == 'MEDIANFLOW':
-       tracker = cv2.legacy.TrackerMedianFlow_create()
-   if tracker_type == 'MOSSE':
-       tracker = cv2.legacy.TrackerMOSSE_create()
-   if tracker_type == 'CSRT':
-       tracker = cv2.TrackerCSRT_create()
+# Argumentos de linha de comando
+
+# Sem argumentos o script funciona como antes (seleção da caixa com o mouse e exibição do vídeo).
+# Com `--offline` a caixa inicial vem de `--bbox` e nenhuma janela é aberta.
+parser = argparse.ArgumentParser(description='Rastreamento de um objeto com OpenCV')
+parser.add_argument('--video', default='videos/race.mp4', help='Caminho do vídeo')
+parser.add_argument('--tracker', default=tracker_types[1], choices=tracker_types, help='Tipo de rastreador')
+parser.add_argument('--offline', action='store_true', help='Rastrear sem interface gráfica')
+parser.add_argument('--bbox', type=int, nargs=4, metavar=('X', 'Y', 'W', 'H'),
+                    help='Caixa delimitadora inicial (obrigatória no modo offline)')
+parser.add_argument('--prefetch', type=int, default=8,
+                    help='Quantidade de frames decodificados à frente em outra thread (0 desativa)')
+parser.add_argument('--csv', help='Arquivo de saída do modo offline (padrão: saída padrão)')
+parser.add_argument('--output', help='Arquivo de vídeo onde os frames anotados são gravados')
+parser.add_argument('--output-every', type=int, default=1, metavar='N', help='Gravar apenas um de cada N frames')
+args = parser.parse_args()
+
+if args.offline and args.bbox is None:
+    parser.error('--offline exige --bbox X Y W H')
+
+tracker_type = args.tracker
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Criar o rastreador
+
+# O registro resolve o construtor correto (`cv2` ou `cv2.legacy`) e avisa quando o tipo
+# não existe na instalação do OpenCV. O GOTURN gera `IOError` quando os arquivos do modelo não estão no diretório.
+try:
+    tracker = create_tracker(tracker_type)
+except (RuntimeError, IOError) as error:
+    print(error)
+    sys.exit(1)
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Gravar o vídeo anotado
+
+# Os frames são codificados em outra thread; quando a codificação não acompanha o rastreamento, os frames excedentes
+# são descartados em vez de atrasar o laço
+writer = None
+if args.output:
+    capture = cv2.VideoCapture(args.video)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    capture.release()
+    writer = AsyncVideoWriter(args.output, fps=fps, every=args.output_every)
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Modo offline
+
+# Rastreia o vídeo inteiro com o motor de `rastreamento/engine.py` e grava uma linha
+# `frame_idx,ok,x,y,w,h` por frame. Nenhuma chamada de interface é feita, então a velocidade
+# é limitada apenas pela leitura do vídeo e pelo `tracker.update()`.
+if args.offline:
+    start = time.perf_counter()
+    results = track_video(args.video, tracker, args.bbox, args.prefetch, writer)
+    output = None
+    frames = 0
+    completed = False
+    try:
+        # O primeiro resultado é lido antes de criar a saída: com um vídeo inválido o erro é reportado sem gerar um
+        # CSV apenas com o cabeçalho
+        first = next(results, None)
+        output = open(args.csv, 'w') if args.csv else sys.stdout
+        output.write('frame_idx,ok,x,y,w,h\n')
+        for frame_idx, ok, (x, y, w, h) in itertools.chain([first] if first is not None else [], results):
+            output.write('{},{},{},{},{},{}\n'.format(frame_idx, int(ok), x, y, w, h))
+            frames += 1
+        completed = True
+    except IOError as error:
+        print(error, file=sys.stderr)
+    finally:
+        results.close()
+        if output is not None and output is not sys.stdout:
+            output.close()
+            # Um CSV interrompido no meio não é deixado para trás
+            if not completed:
+                os.remove(args.csv)
+        if writer is not None:
+            writer.release()
+    if not completed:
+        sys.exit(1)
+
+    elapsed = time.perf_counter() - start
+    print('{} frames em {:.2f} s ({:.1f} FPS)'.format(frames, elapsed, frames / max(elapsed, 1e-9)), file=sys.stderr)
+    sys.exit()
 
 # -------------------------------------------------------------------------------------------------------------------------------#
 # Criar um objeto de captura de vídeo
 
 # O código cria um objeto de captura de vídeo usando a função `cv2.VideoCapture()`.
 # O objeto de captura de vídeo é usado para ler frames de um arquivo de vídeo.
-video = cv2.VideoCapture('videos/race.mp4')
+# Os frames são decodificados à frente em outra thread enquanto o rastreador trabalha.
+video = cv2.VideoCapture(args.video)
 if not video.isOpened():
     print('Não foi possível carregar o vídeo')
     sys.exit()
+if args.prefetch > 0:
+    video = FramePrefetcher(video, depth=args.prefetch)
 
 # Ler o primeiro frame do vídeo
 
@@ -107,6 +189,13 @@ while True:
     cv2.putText(frame, 'FPS: ' + str(int(fps)), (100, 50),
                 cv2.FONT_HERSHEY_SIMPLEX, .75, (50, 170, 50), 2)
 
+    if writer is not None:
+        writer.write(frame)
+
     cv2.imshow('Tracking', frame)
     if cv2.waitKey(1) & 0XFF == 27:
-        break
\ No newline at end of file
+        break
+
+video.release()
+if writer is not None:
+    writer.release()
@@ -2,21 +2,29 @@
 # Rastreamento de Múltiplos Objetos com OpenCV
 
 # Este código demonstra como usar o OpenCV para realizar o rastreamento de múltiplos objetos em uma sequência de vídeo.
-# O código utiliza a função `cv2.legacy.MultiTracker_create()` para criar um objeto multitracker,
-# que pode ser usado para rastrear vários objetos em um vídeo.
+# O código utiliza a classe `ParallelMultiTracker` (mesma interface do `cv2.legacy.MultiTracker_create()`)
+# para criar um objeto multitracker, que pode ser usado para rastrear vários objetos em um vídeo.
 # -------------------------------------------------------------------------------------------------------------------------------#
 
 # -------------------------------------------------------------------------------------------------------------------------------#
 # Importar as bibliotecas necessárias
+import os
 import cv2
 import sys
 from random import randint
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from rastreamento.multitracker import ParallelMultiTracker
+from rastreamento.prefetch import FramePrefetcher
+from rastreamento.trackers import create_tracker
+from rastreamento.video_writer import AsyncVideoWriter
 # -------------------------------------------------------------------------------------------------------------------------------#
 
 # -------------------------------------------------------------------------------------------------------------------------------#
 # Definir os tipos de rastreadores
 
-# O código define uma lista de tipos de rastreadores que podem ser usados pelo objeto multitracker. Esses tipos incluem:
+# Os tipos de rastreadores que podem ser usados pelo objeto multitracker ficam no registro compartilhado
+# `rastreamento/trackers.py`. Esses tipos incluem:
 # `BOOSTING`
 # `MIL`
 # `KCF`
@@ -24,38 +32,9 @@ from random import randint
 # `MEDIANFLOW`
 # `MOSSE`
 # `CSRT`
-tracker_types = ['BOOSTING','MIL','KCF', 'TLD', 'MEDIANFLOW', 'MOSSE', 'CSRT']
-# -------------------------------------------------------------------------------------------------------------------------------#
-
-# -------------------------------------------------------------------------------------------------------------------------------#
-# Criar uma função para criar um rastreador pelo nome
-
-# A função `createTrackerByName()` recebe um tipo de rastreador como argumento
-# e retorna um objeto rastreador desse tipo. Se o tipo de rastreador não for reconhecido,
-# a função retorna `None`.
-def createTrackerByName(trackerType):
-    if trackerType == tracker_types[0]:
-        tracker = cv2.legacy.TrackerBoosting_create()
-    elif trackerType == tracker_types[1]:
-        tracker = cv2.legacy.TrackerMIL_create()
-    elif trackerType == tracker_types[2]:
-        tracker = cv2.legacy.TrackerKCF_create()
-    elif trackerType == tracker_types[3]:
-        tracker = cv2.legacy.TrackerTLD_create()
-    elif trackerType == tracker_types[4]:
-        tracker = cv2.legacy.TrackerMedianFlow_create()
-    elif trackerType == tracker_types[5]:
-        tracker = cv2.legacy.TrackerMOSSE_create()
-    elif trackerType == tracker_types[6]:
-        tracker = cv2.legacy.TrackerCSRT_create()
-    else:
-        tracker = None
-        print('Nome incorreto')
-        print('Os rastreadores disponíveis são: ')
-        for t in tracker_types:
-            print(t)
-
-    return tracker
+# `GOTURN`
+# A função `create_tracker()` recebe um tipo de rastreador como argumento e retorna um objeto rastreador desse tipo.
+# Se o tipo não for reconhecido ou não existir na instalação do OpenCV, ela gera um erro com os tipos disponíveis.
 # -------------------------------------------------------------------------------------------------------------------------------#
 
 # -------------------------------------------------------------------------------------------------------------------------------#
@@ -63,7 +42,16 @@ def createTrackerByName(trackerType):
 
 # O código cria um objeto de captura de vídeo usando a função `cv2.VideoCapture()`.
 # O objeto de captura de vídeo é usado para ler frames de um arquivo de vídeo.
-cap = cv2.VideoCapture("videos/race.mp4")
+# O `FramePrefetcher` decodifica os próximos frames em outra thread enquanto o multitracker trabalha.
+cap = FramePrefetcher(cv2.VideoCapture("videos/race.mp4"), depth=8)
+
+# Arquivo de vídeo onde os frames anotados são gravados em outra thread (None para não gravar) e intervalo entre os
+# frames gravados (1 grava todos)
+output_video = None
+output_every = 1
+writer = None
+if output_video:
+    writer = AsyncVideoWriter(output_video, fps=cap.get(cv2.CAP_PROP_FPS) or 30.0, every=output_every)
 # -------------------------------------------------------------------------------------------------------------------------------#
 
 # -------------------------------------------------------------------------------------------------------------------------------#
@@ -102,18 +90,26 @@ print('Cores {}'.format(colors))
 # -------------------------------------------------------------------------------------------------------------------------------#
 # Criar um objeto multitracker
 
-# O código cria um objeto multitracker usando a função `cv2.legacy.MultiTracker_create()`.
+# O código cria um objeto multitracker usando a classe `ParallelMultiTracker`, que tem a mesma interface do
+# `cv2.legacy.MultiTracker_create()`, mas atualiza os rastreadores em paralelo, um por thread.
 # O objeto multitracker é usado para rastrear vários objetos em um vídeo.
+# Objetos que falham em `max_failures` frames seguidos são removidos e deixam de consumir processamento.
 trackertype = 'CSRT'
-multiTracker = cv2.legacy.MultiTracker_create()
+multiTracker = ParallelMultiTracker(max_failures=30)
 # -------------------------------------------------------------------------------------------------------------------------------#
 
 # -------------------------------------------------------------------------------------------------------------------------------#
 # Adicionar as caixas delimitadoras ao objeto multitracker
 
 # O código adiciona as caixas delimitadoras ao objeto multitracker usando o método `add()` do objeto multitracker.
-for bbox in bboxes:
-    multiTracker.add(createTrackerByName(trackertype), frame, bbox)
+# Se o tipo não existir na instalação (ou, no GOTURN, faltarem os arquivos do modelo), o script é encerrado com a
+# mensagem do erro.
+try:
+    for bbox in bboxes:
+        multiTracker.add(create_tracker(trackertype), frame, bbox)
+except (RuntimeError, IOError) as error:
+    print(error)
+    sys.exit(1)
 
 while cap.isOpened():
     ok, frame = cap.read()
@@ -125,7 +121,11 @@ while cap.isOpened():
 # Atualizar o multitracker com o frame atual para obter as caixas delimitadoras dos objetos rastreados.
 # A função `multiRastreador.update(frame)` retorna um valor booleano 'ok' indicando o sucesso da atualização,
 # e 'boxes' contém as caixas delimitadoras atualizadas para cada objeto rastreado no frame atual.
+# O resultado individual de cada objeto fica em `multiTracker.oks`, na mesma ordem de 'boxes',
+# e os objetos removidos neste frame ficam em `multiTracker.evicted`.
     ok, boxes = multiTracker.update(frame)
+    for track in multiTracker.evicted:
+        print('Objeto {} removido após {} falhas seguidas'.format(track.id, track.failures))
 # -------------------------------------------------------------------------------------------------------------------------------#
 
 # -------------------------------------------------------------------------------------------------------------------------------#
@@ -133,12 +133,24 @@ while cap.isOpened():
 # Converter os valores de ponto flutuante em 'newbox' para inteiros e extrair as coordenadas (x, y, w, h).
 # Desenhar retângulos ao redor dos objetos rastreados no frame atual usando a função `cv2.rectangle` do OpenCV.
 # Os retângulos são coloridos com base na lista 'colors', e os parâmetros especificam a espessura (2)
-    for i, newbox in enumerate(boxes):
+# Objetos que falharam neste frame não são desenhados. A cor é escolhida pelo id do objeto, que
+# corresponde à ordem de seleção e não muda quando outros objetos são removidos.
+    for track, newbox in zip(multiTracker.tracks, boxes):
+        if not track.ok:
+            continue
         (x, y, w, h) = [int(v) for v in newbox]
-        cv2.rectangle(frame, (x, y), (x + w, y + h), colors[i], 2, 1)
+        cv2.rectangle(frame, (x, y), (x + w, y + h), colors[track.id], 2, 1)
+
+    if writer is not None:
+        writer.write(frame)
 
     cv2.imshow('MultiTracker', frame)
 
     if cv2.waitKey(1) & 0XFF == 27:
         break
 # -------------------------------------------------------------------------------------------------------------------------------#
+
+multiTracker.close()
+cap.release()
+if writer is not None:
+    writer.release()
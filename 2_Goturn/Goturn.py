@@ -10,24 +10,51 @@
 import cv2, sys, os
 from random import randint
 
-# Importa o arquivo goturn.caffemodel que armazena os pesos da rede neural e
-# o goturn.prototxt que contém a descrição da arquitetura da rede neural 
-if not (os.path.isfile("goturn.caffemodel") and os.path.isfile("goturn.prototxt")):
-    print('Erro ao carregar os arquivos do Goturn')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from rastreamento.goturn import DnnGoturnTracker, load_goturn
+from rastreamento.prefetch import FramePrefetcher
+from rastreamento.video_writer import AsyncVideoWriter
+
+# Caminhos do arquivo goturn.caffemodel que armazena os pesos da rede neural e
+# do goturn.prototxt que contém a descrição da arquitetura da rede neural
+prototxt = 'goturn.prototxt'
+caffemodel = 'goturn.caffemodel'
+
+# Carrega a rede uma única vez e executa uma inferência de aquecimento, para que o primeiro frame rastreado não
+# tenha um pico de latência
+try:
+    model = load_goturn(prototxt, caffemodel)
+except (IOError, cv2.error) as error:
+    print('Erro ao carregar os arquivos do Goturn: {}'.format(error))
     sys.exit()
+print('Modelo carregado em {:.0f} ms (aquecimento: {:.0f} ms)'.format(model.load_ms, model.warm_up_ms))
 
-# Inicializa o Goturn
-tracker = cv2.TrackerGOTURN_create()
+# Inicializa o Goturn com a rede já carregada, executada pelo módulo dnn do OpenCV. É possível escolher o backend
+# (`cv2.dnn.DNN_BACKEND_*`), o dispositivo (`cv2.dnn.DNN_TARGET_*`) e a quantidade de threads (None mantém os padrões)
+dnn_backend = cv2.dnn.DNN_BACKEND_OPENCV
+dnn_target = cv2.dnn.DNN_TARGET_CPU
+dnn_threads = None
+tracker = DnnGoturnTracker(model, backend=dnn_backend, target=dnn_target, threads=dnn_threads)
 
 # -------------------------------------------------------------------------------------------------------------------------------#
 # Criar um objeto de captura de vídeo
 
 # O código cria um objeto de captura de vídeo usando a função `cv2.VideoCapture()`.
 # O objeto de captura de vídeo é usado para ler frames de um arquivo de vídeo.
+# O `FramePrefetcher` decodifica os próximos frames em outra thread enquanto o Goturn trabalha.
 video = cv2.VideoCapture('videos/race.mp4')
 if not video.isOpened():
     print('Não foi possível carregar o vídeo')
     sys.exit()
+video = FramePrefetcher(video, depth=8)
+
+# Arquivo de vídeo onde os frames anotados são gravados em outra thread (None para não gravar) e intervalo entre os
+# frames gravados (1 grava todos)
+output_video = None
+output_every = 1
+writer = None
+if output_video:
+    writer = AsyncVideoWriter(output_video, fps=video.get(cv2.CAP_PROP_FPS) or 30.0, every=output_every)
 
 # Ler o primeiro frame do vídeo
 
@@ -78,6 +105,13 @@ while True:
     cv2.putText(frame, 'FPS: ' + str(int(fps)), (100, 50),
                 cv2.FONT_HERSHEY_SIMPLEX, .75, (50, 170, 50), 2)
 
+    if writer is not None:
+        writer.write(frame)
+
     cv2.imshow('Tracking', frame)
     if cv2.waitKey(1) & 0XFF == 27:
-        break
\ No newline at end of file
+        break
+
+video.release()
+if writer is not None:
+    writer.release()
@@ -0,0 +1,94 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Rastreamento de Vários Objetos com OpenCV usando o Goturn
+
+# Versão de `Goturn.py` para vários objetos. O `MultiGoturnTracker` (rastreamento/goturn.py) executa a rede do GOTURN
+# pelo módulo dnn do OpenCV e junta todos os objetos em um único lote: rastrear vários objetos custa uma única
+# inferência por frame, em vez de uma inferência por objeto.
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Importar as bibliotecas necessárias
+import cv2, sys, os
+from random import randint
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from rastreamento.goturn import MultiGoturnTracker, load_goturn
+from rastreamento.prefetch import FramePrefetcher
+from rastreamento.video_writer import AsyncVideoWriter
+
+# Carrega a rede uma única vez (goturn.prototxt e goturn.caffemodel no diretório de trabalho)
+try:
+    model = load_goturn('goturn.prototxt', 'goturn.caffemodel')
+except (IOError, cv2.error) as error:
+    print('Erro ao carregar os arquivos do Goturn: {}'.format(error))
+    sys.exit()
+
+# Backend, dispositivo e quantidade de threads da rede (None mantém os padrões). Os objetos perdidos por 30 frames
+# seguidos são removidos.
+tracker = MultiGoturnTracker(model, backend=cv2.dnn.DNN_BACKEND_OPENCV, target=cv2.dnn.DNN_TARGET_CPU, threads=None,
+                             max_failures=30)
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Criar um objeto de captura de vídeo e ler o primeiro frame
+video = cv2.VideoCapture('videos/race.mp4')
+if not video.isOpened():
+    print('Não foi possível carregar o vídeo')
+    sys.exit()
+video = FramePrefetcher(video, depth=8)
+
+# Arquivo de vídeo onde os frames anotados são gravados em outra thread (None para não gravar) e intervalo entre os
+# frames gravados (1 grava todos)
+output_video = None
+output_every = 1
+writer = None
+if output_video:
+    writer = AsyncVideoWriter(output_video, fps=video.get(cv2.CAP_PROP_FPS) or 30.0, every=output_every)
+
+ok, frame = video.read()
+if not ok:
+    print('Não foi possível ler o arquivo de vídeo')
+    sys.exit()
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Selecionar as caixas delimitadoras dos objetos (ENTER confirma cada uma, ESC encerra a seleção)
+bboxes = cv2.selectROIs('Tracking', frame, False)
+
+colors = {}
+for bbox in bboxes:
+    target_id = tracker.add(frame, bbox)
+    colors[target_id] = (randint(0, 255), randint(0, 255), randint(0, 255))
+
+# Rastreia todos os objetos com uma inferência por frame
+while True:
+    ok, frame = video.read()
+    if not ok:
+        break
+
+    timer = cv2.getTickCount()
+    results = tracker.update(frame)
+    fps = cv2.getTickFrequency() / (cv2.getTickCount() - timer)
+
+    for track in tracker.evicted:
+        print('Objeto {} perdido'.format(track.id))
+
+    for target_id, (ok, bbox) in results.items():
+        if ok:
+            (x, y, w, h) = [int(v) for v in bbox]
+            cv2.rectangle(frame, (x, y), (x + w, y + h), colors[target_id], 2, 1)
+
+    cv2.putText(frame, 'Goturn Tracker ({} objetos)'.format(len(tracker)), (100, 20),
+                cv2.FONT_HERSHEY_SIMPLEX, .75, (50, 170, 50), 2)
+
+    cv2.putText(frame, 'FPS: ' + str(int(fps)), (100, 50),
+                cv2.FONT_HERSHEY_SIMPLEX, .75, (50, 170, 50), 2)
+
+    if writer is not None:
+        writer.write(frame)
+
+    cv2.imshow('Tracking', frame)
+    if cv2.waitKey(1) & 0XFF == 27:
+        break
+
+video.release()
+if writer is not None:
+    writer.release()
@@ -9,11 +9,19 @@
 
 # Rastreamento de Objeto com OpenCV
 
+# O rastreamento é feito pelo `ColorHistogramTracker` (rastreamento/color_tracker.py), que converte para HSV e
+# retroprojeta apenas uma janela de busca em volta do objeto, em vez do frame inteiro.
+
 # Importar bibliotecas necessárias
+import os
+import sys
 import cv2
 import time
 from imutils.video import VideoStream  # Para acesso à webcam
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from rastreamento.color_tracker import ColorHistogramTracker
+
 # 1. Iniciar a captura de vídeo
 cap = VideoStream(src=0).start()  # Iniciar a transmissão da webcam
 time.sleep(1.0)  # Pausa para a câmera iniciar
@@ -27,41 +35,31 @@ x, y, w, h = bbox  # Extrair coordenadas da ROI
 track_window = (x, y, w, h)  # Criar uma tupla para armazenar a janela de rastreamento
 print(track_window)  # Imprimir as coordenadas para verificação
 
-# 3. Extrair a ROI e converter para o espaço de cores HSV
+# 3. Extrair a ROI
 roi = frame[y:y+h, x:x+w]  # Recortar a ROI do frame
 #cv2.imshow('ROI', roi)  # Exibir a ROI
 
-# Converter a ROI para o espaço de cores HSV (para melhor análise de cores)
-hsv_roi = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
-#cv2.imshow("ROI HSV", hsv_roi)  # Exibir a ROI no espaço HSV
-
-# 4. Calcular o histograma da ROI
-roi_hist = cv2.calcHist([hsv_roi], [0], None, [180], [0, 180])  # Calcular o histograma do canal H
-
 # Exibir o histograma da ROI (apenas para visualização)
 import matplotlib.pyplot as plt
 plt.hist(roi.ravel(), 180, [0, 180])  # Plotar o histograma
 #plt.show()
 
-# Normalizar o histograma
-roi_hist = cv2.normalize(roi_hist, roi_hist, 0, 255, cv2.NORM_MINMAX)  # Normalizar os valores de 0 a 255
-
-# 5. Configurar critérios de parada para o rastreamento
+# 4. Configurar critérios de parada para o rastreamento
 term_crit = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 1)  # Critérios de parada para o meanShift
 
+# 5. Criar o rastreador, que converte a ROI para HSV e calcula o histograma normalizado do canal H (matiz).
+# A cada frame, apenas a janela de busca (2x a janela do objeto) é convertida e retroprojetada.
+tracker = ColorHistogramTracker('meanshift', channels=[0], bins=[180], ranges=[0, 180], search_expand=2.0,
+                                term_crit=term_crit)
+tracker.init(frame, track_window)
+
 # 6. Loop de rastreamento
 while True:
     ret, frame = cap.read()  # Capturar um frame
 
     if ret == True:
-        # Converter o frame para o espaço de cores HSV
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-
-        # Aplicar backprojection para encontrar regiões com cores semelhantes à ROI
-        dst = cv2.calcBackProject([hsv], [0], roi_hist, [0,180], 1)
-
-        # Aplicar o algoritmo meanShift para rastrear o objeto
-        ret, track_window = cv2.meanShift(dst, track_window, term_crit)
+        # Aplicar backprojection na janela de busca e o algoritmo meanShift para rastrear o objeto
+        ret, track_window = tracker.update(frame)
 
         # Atualizar as coordenadas da janela de rastreamento
         x, y, w, h = track_window
@@ -71,7 +69,7 @@ while True:
 
         # Exibir os frames resultantes
         cv2.imshow('Meanshift tracking', frame)  # Frame com rastreamento
-        cv2.imshow('dst', dst)  # Backprojection
+        cv2.imshow('dst', tracker.back_projection)  # Backprojection da janela de busca
         #cv2.imshow('ROI', roi)  # ROI original
 
         # Sair do loop ao pressionar Enter
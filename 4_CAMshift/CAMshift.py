@@ -7,12 +7,25 @@
 # do objeto ao longo do tempo, tornando-o mais robusto para o rastreamento contínuo em vídeos
 # -------------------------------------------------------------------------------------------------------------------------------#
 
+# O rastreamento é feito pelo `ColorHistogramTracker` (rastreamento/color_tracker.py), que converte para HSV e
+# retroprojeta apenas uma janela de busca em volta do objeto, em vez do frame inteiro.
+#
+# Por padrão o histograma é o de matiz da seleção inicial, fixo, como no script original. A atualização adaptativa é
+# opcional: com `histogram = 'hs'` e `learning_rate` maior que zero (por exemplo 0.05), o histograma passa a
+# acompanhar mudanças de iluminação e de cor do objeto. Em cenas sem essas mudanças ela pode piorar o rastreamento,
+# pois o histograma absorve aos poucos o fundo que entra na janela.
+
 # Importar bibliotecas necessárias
+import os
+import sys
 import numpy as np  # Para operações com arrays
 import cv2  # Para processamento de imagens
 from imutils.video import VideoStream  # Para acesso à webcam
 import time  # Para pausas e temporizações
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from rastreamento.color_tracker import HISTOGRAMS, ColorHistogramTracker
+
 # 1. Iniciar a captura de vídeo
 cap = VideoStream(src=0).start()  # Iniciar a transmissão da webcam
 time.sleep(1.0)  # Pausa para a câmera iniciar
@@ -25,36 +38,31 @@ bbox = cv2.selectROI(frame, False)  # Permitir ao usuário selecionar a ROI
 x, y, w, h = bbox  # Extrair coordenadas da ROI
 track_window = (x, y, w, h)  # Criar uma tupla para armazenar a janela de rastreamento
 
-# 3. Extrair a ROI e converter para o espaço de cores HSV
-roi = frame[y:y+h, x:x+w]  # Recortar a ROI do frame
+# 3. Configurar critérios de parada para o rastreamento
+term_crit = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 1)  # Critérios de parada para o CamShift
 
-# Converter a ROI para o espaço de cores HSV (para melhor análise de cores)
-hsv_roi = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
+# Histograma usado: 'h' (apenas matiz) ou 'hs' (matiz e saturação), e peso da atualização do histograma a cada frame
+# com a região rastreada (0 mantém o histograma da seleção inicial)
+histogram = 'h'
+learning_rate = 0.0
 
-# 4. Calcular o histograma da ROI
-roi_hist = cv2.calcHist([hsv_roi], [0], None, [180], [0, 180])  # Calcular o histograma do canal H
-roi_hist = cv2.normalize(roi_hist, roi_hist, 0, 255, cv2.NORM_MINMAX)  # Normalizar o histograma
-
-# 5. Configurar critérios de parada para o rastreamento
-term_crit = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 1)  # Critérios de parada para o CamShift
+# 4. Criar o rastreador, que converte a ROI para HSV e calcula o histograma normalizado.
+# 5. A cada frame, apenas a janela de busca (2x a janela do objeto) é convertida e retroprojetada.
+tracker = ColorHistogramTracker('camshift', search_expand=2.0, term_crit=term_crit, learning_rate=learning_rate,
+                                **HISTOGRAMS[histogram])
+tracker.init(frame, track_window)
 
 # 6. Loop de rastreamento
 while True:
     ret, frame = cap.read()  # Capturar um frame
 
     if ret == True:
-        # Converter o frame para o espaço de cores HSV
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-
-        # Aplicar backprojection para encontrar regiões com cores semelhantes à ROI
-        dst = cv2.calcBackProject([hsv], [0], roi_hist, [0,180], 1)
-
-        # Aplicar o algoritmo CamShift para rastrear o objeto
-        ret, track_window = cv2.CamShift(dst, track_window, term_crit)
+        # Aplicar backprojection na janela de busca e o algoritmo CamShift para rastrear o objeto
+        ret, track_window = tracker.update(frame)
 
-        # Obter os pontos da caixa delimitadora do objeto rastreado
-        pts = cv2.boxPoints(ret)
-        pts = np.int0(pts)  # Converter os pontos para inteiros
+        # Obter os pontos da caixa delimitadora (rotacionada) do objeto rastreado
+        pts = cv2.boxPoints(tracker.rotated_box)
+        pts = pts.astype(np.int32)  # Converter os pontos para inteiros
 
         # Desenhar um polígono ao redor do objeto rastreado
         img2 = cv2.polylines(frame, [pts], True, 255, 2)  # Linha branca, grossura 2
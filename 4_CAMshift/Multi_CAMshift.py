@@ -0,0 +1,71 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Rastreamento de Vários Objetos com OpenCV usando o CAMshift
+
+# Versão de `CAMshift.py` para vários alvos de cor ao mesmo tempo. O `MultiColorTracker` (rastreamento/color_tracker.py)
+# converte o frame para HSV no máximo uma vez, retroprojeta cada alvo apenas na sua janela de busca e processa os
+# alvos em paralelo. O resultado é uma caixa rotacionada por id de alvo.
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+# Importar bibliotecas necessárias
+import os
+import sys
+from random import randint
+import numpy as np  # Para operações com arrays
+import cv2  # Para processamento de imagens
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from rastreamento.color_tracker import HISTOGRAMS, MultiColorTracker
+
+# 1. Iniciar a captura de vídeo
+cap = cv2.VideoCapture(0)
+
+# 2. Selecionar as regiões de interesse (ENTER confirma cada uma, ESC encerra a seleção)
+ret, frame = cap.read()  # Capturar um frame inicial
+bboxes = cv2.selectROIs('Multi Camshift', frame, False)
+
+# 3. Configurar o rastreador e a remoção dos alvos perdidos por 30 frames seguidos. Como em `CAMshift.py`, o padrão
+# é o histograma de matiz fixo; `histogram = 'hs'` com `learning_rate` maior que zero (por exemplo 0.05) ativa a
+# atualização adaptativa do histograma
+histogram = 'h'
+learning_rate = 0.0
+term_crit = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 1)  # Critérios de parada para o CamShift
+tracker = MultiColorTracker('camshift', max_failures=30, search_expand=2.0, term_crit=term_crit,
+                            learning_rate=learning_rate, **HISTOGRAMS[histogram])
+
+# 4. Adicionar os alvos, cada um com uma cor de desenho
+colors = {}
+for bbox in bboxes:
+    target_id = tracker.add(frame, bbox)
+    colors[target_id] = (randint(0, 255), randint(0, 255), randint(0, 255))
+
+# 5. Loop de rastreamento
+while True:
+    ret, frame = cap.read()  # Capturar um frame
+    if not ret:
+        break
+
+    # Atualizar todos os alvos e obter a caixa rotacionada de cada um
+    boxes = tracker.update(frame)
+
+    for track in tracker.evicted:
+        print('Alvo {} perdido'.format(track.id))
+
+    # Desenhar um polígono ao redor de cada alvo encontrado
+    for track in tracker.tracks:
+        if not track.ok:
+            continue
+        pts = cv2.boxPoints(boxes[track.id]).astype(np.int32)
+        cv2.polylines(frame, [pts], True, colors[track.id], 2)
+        cv2.putText(frame, str(track.id), tuple(pts[1]), cv2.FONT_HERSHEY_SIMPLEX, .5, colors[track.id], 2)
+
+    # Exibir o frame com o rastreamento
+    cv2.imshow('Multi Camshift', frame)
+
+    # Sair do loop ao pressionar Enter
+    if cv2.waitKey(1) == 13:
+        break
+
+# 6. Finalizar a captura e liberar recursos
+tracker.close()
+cv2.destroyAllWindows()
+cap.release()
@@ -1,61 +1,95 @@
 # -------------------------------------------------------------------------------------------------------------------------------#
 # Rastreamento de Objeto com OpenCV usando o OpticalFlow Dense
 
-# O Optical Flow Denso (Dense Optical Flow) é uma técnica de visão computacional que calcula o movimento aparente dos pixels em uma 
-# sequência de imagens. Diferente do Optical Flow tradicional, que opera em pontos específicos, o Dense Optical Flow calcula o vetor 
-# de movimento para todos os pixels da imagem. Isso proporciona uma representação mais detalhada do movimento, sendo útil em aplicações 
+# O Optical Flow Denso (Dense Optical Flow) é uma técnica de visão computacional que calcula o movimento aparente dos pixels em uma
+# sequência de imagens. Diferente do Optical Flow tradicional, que opera em pontos específicos, o Dense Optical Flow calcula o vetor
+# de movimento para todos os pixels da imagem. Isso proporciona uma representação mais detalhada do movimento, sendo útil em aplicações
 # como rastreamento de objetos, análise de fluxo em vídeos e detecção de padrões de movimento em imagens.
+#
+# O cálculo é feito pelo `DenseFlow` (rastreamento/dense_flow.py) em uma escala reduzida do frame, reaproveitando o
+# fluxo anterior como estimativa inicial, e opcionalmente apenas dentro de regiões de interesse selecionadas no
+# primeiro frame. A troca entre precisão e FPS de cada escala é medida por `7_Benchmark/benchmark_dense_flow.py`.
 # -------------------------------------------------------------------------------------------------------------------------------#
 
+import os
+import sys
+import time
 import cv2
-import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from rastreamento.dense_flow import DenseFlow
+from rastreamento.flow_render import FlowRenderer
+from rastreamento.video_writer import AsyncVideoWriter
+
+# Escala em que o fluxo é calculado (1.0 = resolução original). O resultado é ampliado para o tamanho do frame.
+processing_scale = 0.5
+
+# Calcular o fluxo apenas dentro de regiões selecionadas com o mouse no primeiro frame
+roi_mode = False
 
 # Abre o vídeo de entrada
 cap = cv2.VideoCapture("videos/walking.avi")
 
-# Lê o primeiro quadro do vídeo e converte para escala de cinza
-ret, first_frame = cap.read()
-frame_gray_init = cv2.cvtColor(first_frame, cv2.COLOR_BGR2GRAY)
+# Arquivo de vídeo onde os frames anotados são gravados em outra thread (None para não gravar) e intervalo entre os
+# frames gravados (1 grava todos)
+output_video = None
+output_every = 1
+writer = None
+if output_video:
+    writer = AsyncVideoWriter(output_video, fps=cap.get(cv2.CAP_PROP_FPS) or 30.0, every=output_every)
 
-# Inicializa a imagem HSV (Matiz, Saturação, Valor) para representar o fluxo óptico
-hsv = np.zeros_like(first_frame)
-hsv[..., 1] = 255  # Define a saturação para o máximo
+# Lê o primeiro quadro do vídeo
+ret, first_frame = cap.read()
+if not ret:
+    print("Não foi possível ler o vídeo")
+    sys.exit()
+
+# Seleciona as regiões de interesse (ENTER confirma cada uma, ESC encerra a seleção)
+rois = None
+if roi_mode:
+    rois = [tuple(roi) for roi in cv2.selectROIs('Dense optical flow', first_frame, False)] or None
+
+# Cria o motor de fluxo óptico com os parâmetros do método Farneback
+flow_engine = DenseFlow(
+                        scale=processing_scale,  # Escala de processamento
+                        pyr_scale=0.5,           # Escala da piramide de cores
+                        levels=3,                # Quantidade de niveis da piramide
+                        winsize=15,              # Tamanho da janela
+                        iterations=3,            # iteração a cada nivel da pirâmide
+                        poly_n=5,                # Tamanho da vizinhança do pixel para a expansão polinomial
+                        poly_sigma=1.2,          # desvio padrão
+                        reuse_flow=True          # Usa o fluxo anterior como estimativa inicial
+                        )
+
+# O primeiro quadro serve de referência
+flow_engine.update(first_frame)
+
+# Cria o renderizador do fluxo, que reaproveita os mesmos buffers a cada quadro. O brilho é normalizado pelo maior
+# deslocamento já visto (com decaimento lento), para que as cores sejam consistentes entre os quadros.
+renderer = FlowRenderer(max_magnitude=None, decay=0.99)
 
 # Loop principal
 while True:
-    # Lê um novo quadro do vídeo e converte para escala de cinza
+    # Lê um novo quadro do vídeo
     ret, frame = cap.read()
-    frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-    # Calcula o fluxo óptico usando o método Farneback
-    flow = cv2.calcOpticalFlowFarneback(
-                                        frame_gray_init, # primeiro Frame
-                                        frame_gray,      # próximo frame
-                                        None,            # Vetor do ponto 2D, caso tenha uma direção definida
-                                        0.5,             # Escala da piramide de cores
-                                        3,               # Quantidade de niveis da piramide
-                                        15,              # Tamanho da janela
-                                        3,               # iteração a cada nivel da pirâmide
-                                        5,               # Tamanho da vizinhança do pixel para a expansão polinomial
-                                        1.2,             # desvio padrão
-                                        0                # flags
-                                        )
-
-    # Converte as coordenadas do fluxo óptico para magnitude e ângulo
-    magnitude, angle = cv2.cartToPolar(flow[..., 0], flow[..., 1])
-
-    # hsv[...,0] = altera a matriz H (matiz)
-    # hsv[...,1] = altera a matriz S (saturação)
-    # hsv[...,2] = altera a matriz V (intensidade)
-
-    # Converte o ângulo para a faixa de valores aceitável pelo espaço de cor HSV
-    hsv[..., 0] = angle * (180 / (np.pi / 2))
-
-    # Normaliza a magnitude para o intervalo de valores 0-255
-    hsv[..., 2] = cv2.normalize(magnitude, None, 0, 255, cv2.NORM_MINMAX)
-
-    # Converte a imagem HSV de volta para o espaço de cor BGR
-    final = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+    if not ret:
+        break
+
+    # Calcula o fluxo óptico entre o quadro anterior e o atual
+    start = time.perf_counter()
+    flow = flow_engine.update(frame, rois)
+    fps = 1 / (time.perf_counter() - start)
+
+    # Converte o fluxo em cores: matiz = direção do movimento, brilho = intensidade do movimento
+    final = renderer.render(flow)
+
+    # Exibe o FPS do cálculo do fluxo
+    cv2.putText(final, 'FPS: {:.1f} (escala {})'.format(fps, processing_scale), (10, 20),
+                cv2.FONT_HERSHEY_SIMPLEX, .6, (255, 255, 255), 1)
+
+    # Grava uma cópia, pois o renderizador reaproveita o mesmo buffer no próximo quadro
+    if writer is not None:
+        writer.write(final.copy())
 
     # Exibe o resultado do fluxo óptico denso
     cv2.imshow('Dense optical flow', final)
@@ -64,9 +98,8 @@ while True:
     if cv2.waitKey(1) == 13:
         break
 
-    # Atualiza o quadro de referência para o próximo loop
-    frame_gray_init = frame_gray
-
 # Libera os recursos e fecha a janela
 cap.release()
+if writer is not None:
+    writer.release()
 cv2.destroyAllWindows()
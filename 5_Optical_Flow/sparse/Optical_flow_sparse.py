@@ -1,69 +1,92 @@
 # -------------------------------------------------------------------------------------------------------------------------------#
 # Rastreamento de Objeto com OpenCV usando o OpticalFlow Sparse
 
-#O Optical Flow Sparse é uma técnica de visão computacional que calcula o movimento aparente de pontos-chave específicos em uma 
-#sequência de imagens. Ao contrário do Optical Flow Denso, que calcula o vetor de movimento para todos os pixels da imagem, 
-#o Optical Flow Sparse se concentra em pontos selecionados. Isso o torna mais eficiente computacionalmente, sendo adequado para 
-#situações em que a densidade de pontos a serem rastreados pode ser reduzida sem comprometer a precisão do movimento estimado, 
+#O Optical Flow Sparse é uma técnica de visão computacional que calcula o movimento aparente de pontos-chave específicos em uma
+#sequência de imagens. Ao contrário do Optical Flow Denso, que calcula o vetor de movimento para todos os pixels da imagem,
+#o Optical Flow Sparse se concentra em pontos selecionados. Isso o torna mais eficiente computacionalmente, sendo adequado para
+#situações em que a densidade de pontos a serem rastreados pode ser reduzida sem comprometer a precisão do movimento estimado,
 #como em tarefas de rastreamento de objetos específicos em vídeos.
+#
+# Os pontos são rastreados pelo `SparseFlowTracker` (rastreamento/sparse_flow.py): cada ponto tem um id (e uma cor)
+# estável, e novos pontos de interesse são procurados nas regiões descobertas quando muitos pontos se perdem. Os rastros
+# dos últimos quadros ficam no `TrajectoryStore` (rastreamento/trajectories.py) e podem ser gravados em CSV.
 # -------------------------------------------------------------------------------------------------------------------------------#
 
+import os
+import sys
 import cv2
 import numpy as np
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from rastreamento.sparse_flow import SparseFlowTracker
+from rastreamento.trajectories import TrajectoryStore
+from rastreamento.video_writer import AsyncVideoWriter
+
 # Abre o vídeo de entrada
 cap = cv2.VideoCapture("videos/walking.avi")
 
-# Parâmetros para o método Shi-Tomasi usado para encontrar pontos de interesse iniciais
-parameters_shitomasi = dict(maxCorners=100, qualityLevel=0.3, minDistance=7)
+# Arquivo de vídeo onde os frames anotados são gravados em outra thread (None para não gravar) e intervalo entre os
+# frames gravados (1 grava todos)
+output_video = None
+output_every = 1
+writer = None
+if output_video:
+    writer = AsyncVideoWriter(output_video, fps=cap.get(cv2.CAP_PROP_FPS) or 30.0, every=output_every)
+
+# Parâmetros para o método Shi-Tomasi usado para encontrar pontos de interesse, e quantidade mínima de pontos antes de
+# procurar novos
+parameters_shitomasi = dict(max_corners=100, quality_level=0.3, min_distance=7)
+min_points = 50
 
 # Parâmetros para o método Lucas-Kanade usado para calcular o fluxo óptico
-parameters_lucas_kanade = dict(winSize=(15, 15), maxLevel=2,
+parameters_lucas_kanade = dict(win_size=(15, 15), max_level=2,
                                criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
 
-# Gera cores aleatórias para visualização dos pontos
-colors = np.random.randint(0, 255, (100, 3))
+# Filtros de consistência: distância máxima (pixels) do rastreamento de ida e volta e percentil do erro do
+# Lucas-Kanade acima do qual o ponto é descartado (None desativa o filtro)
+parameters_filters = dict(fb_threshold=1.0, error_percentile=98)
 
-# Lê o primeiro quadro do vídeo
-ret, frame = cap.read()
+# Cria o rastreador de pontos
+tracker = SparseFlowTracker(min_points=min_points, **parameters_shitomasi, **parameters_lucas_kanade,
+                            **parameters_filters)
 
-# Converte o primeiro quadro para escala de cinza
-frame_gray_init = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+# Cria o armazenamento das trajetórias: quantidade de quadros guardados por ponto, quantidade de passos desenhados e
+# arquivo CSV onde as trajetórias são gravadas ao final (None para não gravar)
+trajectories = TrajectoryStore(length=64)
+trail_steps = 32
+trajectories_csv = None
 
-# Encontra pontos de interesse usando o método Shi-Tomasi
-edges = cv2.goodFeaturesToTrack(frame_gray_init, mask=None, **parameters_shitomasi)
+# Gera cores aleatórias para visualização dos pontos (a cor de cada ponto é escolhida pelo seu id)
+colors = np.random.randint(0, 255, (256, 3))
 
-# Cria uma máscara para desenhar os vetores do fluxo óptico
-mask = np.zeros_like(frame)
+# Lê o primeiro quadro do vídeo
+ret, frame = cap.read()
+if not ret:
+    print("Não foi possível ler o vídeo")
+    sys.exit()
+
+# Encontra os pontos de interesse iniciais
+trajectories.update(*tracker.update(frame))
 
 while True:
     # Lê um novo quadro do vídeo
     ret, frame = cap.read()
+    if not ret:
+        break
 
-    # Converte o quadro para escala de cinza
-    frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-    # Calcula o fluxo óptico entre os quadros usando o método Lucas-Kanade
-    new_edges, status, errors = cv2.calcOpticalFlowPyrLK(frame_gray_init, frame_gray, edges, None,
-                                                         **parameters_lucas_kanade)
-
-    # Filtra os pontos de acordo com o status
-    news = new_edges[status == 1]
-    olds = edges[status == 1]
-
-    # Desenha linhas e círculos nos quadros para visualizar o fluxo óptico
-    for i, (new, old) in enumerate(zip(news, olds)):
-        a, b = new.ravel()
-        c, d = old.ravel()
+    # Calcula o fluxo óptico entre os quadros usando o método Lucas-Kanade e registra as novas posições
+    ids, news = tracker.update(frame)
+    trajectories.update(ids, news)
 
-        # Desenha uma linha indicando o vetor do fluxo óptico
-        mask = cv2.line(mask, (int(a), int(b)), (int(c), int(d)), colors[i].tolist(), 2)
+    # Desenha os rastros dos últimos quadros de todos os pontos
+    img = trajectories.render(frame, steps=trail_steps, colors=colors)
 
-        # Desenha um círculo nos pontos de interesse
-        frame = cv2.circle(frame, (int(a), int(b)), 5, colors[i].tolist(), -1)
+    # Desenha um círculo nos pontos de interesse
+    for point_id, (a, b) in zip(ids, news):
+        cv2.circle(img, (int(a), int(b)), 5, colors[point_id % len(colors)].tolist(), -1)
 
-    # Adiciona a máscara ao quadro para visualização
-    img = cv2.add(frame, mask)
+    if writer is not None:
+        writer.write(img)
 
     # Exibe o quadro resultante
     cv2.imshow('Optical flow', img)
@@ -72,10 +95,12 @@ while True:
     if cv2.waitKey(1) == 13:
         break
 
-    # Atualiza o quadro de referência e os pontos de interesse
-    frame_gray_init = frame_gray.copy()
-    edges = news.reshape(-1, 1, 2)
+# Grava as trajetórias guardadas
+if trajectories_csv:
+    trajectories.save(trajectories_csv)
 
 # Fecha todas as janelas e libera os recursos
 cv2.destroyAllWindows()
 cap.release()
+if writer is not None:
+    writer.release()
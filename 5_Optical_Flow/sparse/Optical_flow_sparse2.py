@@ -1,90 +1,142 @@
 # -------------------------------------------------------------------------------------------------------------------------------#
 # Rastreamento de Objeto com OpenCV usando o OpticalFlow Sparse
 
-#O Optical Flow Sparse é uma técnica de visão computacional que calcula o movimento aparente de pontos-chave específicos em uma 
-#sequência de imagens. Ao contrário do Optical Flow Denso, que calcula o vetor de movimento para todos os pixels da imagem, 
-#o Optical Flow Sparse se concentra em pontos selecionados. Isso o torna mais eficiente computacionalmente, sendo adequado para 
-#situações em que a densidade de pontos a serem rastreados pode ser reduzida sem comprometer a precisão do movimento estimado, 
+#O Optical Flow Sparse é uma técnica de visão computacional que calcula o movimento aparente de pontos-chave específicos em uma
+#sequência de imagens. Ao contrário do Optical Flow Denso, que calcula o vetor de movimento para todos os pixels da imagem,
+#o Optical Flow Sparse se concentra em pontos selecionados. Isso o torna mais eficiente computacionalmente, sendo adequado para
+#situações em que a densidade de pontos a serem rastreados pode ser reduzida sem comprometer a precisão do movimento estimado,
 #como em tarefas de rastreamento de objetos específicos em vídeos.
+#
+# Os pontos são escolhidos com o mouse: o botão esquerdo adiciona um ponto, o botão direito remove o ponto mais
+# próximo e a tecla 'c' remove todos. Todos os pontos são rastreados juntos pelo `SparseFlowTracker`
+# (rastreamento/sparse_flow.py), em uma única chamada do Lucas-Kanade por quadro.
+#
+# Modo sem interface gráfica, com os pontos informados na linha de comando:
+#   python 5_Optical_Flow/sparse/Optical_flow_sparse2.py --headless --video videos/walking.avi --points 100 120 300 200
 # -------------------------------------------------------------------------------------------------------------------------------#
 
+import argparse
+import os
+import sys
 import cv2
 import numpy as np
 
-# Inicializa a captura de vídeo da câmera (0 representa a câmera padrão)
-cap = cv2.VideoCapture(0)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from rastreamento.sparse_flow import SparseFlowTracker
+from rastreamento.trajectories import TrajectoryStore
 
-# Lê o primeiro quadro do vídeo e converte para escala de cinza
+# Argumentos de linha de comando. Sem argumentos o script usa a câmera padrão e a seleção com o mouse.
+parser = argparse.ArgumentParser(description='Rastreamento de pontos com optical flow esparso')
+parser.add_argument('--video', default='0', help='Caminho do vídeo ou índice da câmera (padrão: 0)')
+parser.add_argument('--points', type=float, nargs='+', metavar='X Y',
+                    help='Pontos iniciais no primeiro quadro (x1 y1 x2 y2 ...)')
+parser.add_argument('--headless', action='store_true', help='Rastrear sem interface gráfica')
+parser.add_argument('--csv', help='Arquivo de saída do modo sem interface (padrão: saída padrão)')
+args = parser.parse_args()
+
+if args.points is not None and len(args.points) % 2:
+    parser.error('--points exige pares de coordenadas X Y')
+if args.headless and not args.points:
+    parser.error('--headless exige --points')
+
+# Inicializa a captura de vídeo (um número representa a câmera com esse índice)
+cap = cv2.VideoCapture(int(args.video) if args.video.isdigit() else args.video)
+
+# Lê o primeiro quadro do vídeo
 ret, frame = cap.read()
-frame_gray_init = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+if not ret:
+    print("Não foi possível ler o vídeo")
+    sys.exit(1)
 
 # Parâmetros para o método Lucas-Kanade usado para calcular o fluxo óptico
-parameters_lucas_kanade = dict(winSize=(15, 15),
-                               maxLevel=4,
+parameters_lucas_kanade = dict(win_size=(15, 15),
+                               max_level=4,
                                criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
 
-# Função de callback para seleção de ponto com o clique do mouse
+# Distância máxima (pixels) do rastreamento de ida e volta; acima dela o ponto é considerado perdido
+fb_threshold = 1.0
+
+# Cria o rastreador sem busca automática de pontos (min_points=0): apenas os pontos adicionados são rastreados
+tracker = SparseFlowTracker(min_points=0, fb_threshold=fb_threshold, **parameters_lucas_kanade)
+tracker.update(frame)
+if args.points:
+    tracker.add(np.array(args.points).reshape(-1, 2))
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Modo sem interface gráfica
+
+# Grava uma linha `frame_idx,point_id,x,y` por ponto rastreado em cada quadro
+if args.headless:
+    output = open(args.csv, 'w') if args.csv else sys.stdout
+    output.write('frame_idx,point_id,x,y\n')
+    frame_idx = 0
+    try:
+        while True:
+            for point_id, (x, y) in zip(tracker.ids, tracker.points):
+                output.write('{},{},{:.2f},{:.2f}\n'.format(frame_idx, point_id, x, y))
+            ret, frame = cap.read()
+            if not ret or len(tracker.ids) == 0:
+                break
+            tracker.update(frame)
+            frame_idx += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    cap.release()
+    sys.exit()
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Modo interativo
+
+# Função de callback do mouse: o botão esquerdo adiciona um ponto e o direito remove o mais próximo
 def select_point(event, x, y, flags, params):
-    global point, selected_point, old_points
     if event == cv2.EVENT_LBUTTONDOWN:
-        point = (x, y)
-        selected_point = True
-        old_points = np.array([[x, y]], dtype=np.float32)
+        tracker.add([(x, y)])
+    elif event == cv2.EVENT_RBUTTONDOWN:
+        point_id = tracker.nearest(x, y, radius=15)
+        if point_id is not None:
+            tracker.remove([point_id])
 
 # Cria uma janela para exibição do quadro e associa a função de callback
 cv2.namedWindow('Frame')
 cv2.setMouseCallback('Frame', select_point)
 
-# Variáveis globais para o ponto selecionado, estado de seleção e pontos antigos
-selected_point = False
-point = ()
-old_points = np.array([[]])
-
-# Cria uma máscara inicializada com zeros
-mask = np.zeros_like(frame)
+# Armazenamento das trajetórias (últimos 64 quadros), cores por id e fundo escuro onde os rastros são desenhados
+trajectories = TrajectoryStore(length=64)
+colors = np.random.randint(0, 255, (256, 3))
+trail_canvas = np.zeros_like(frame)
 
 while True:
-    # Lê um novo quadro da câmera e converte para escala de cinza
+    # Lê um novo quadro da câmera
     ret, frame = cap.read()
-    frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-    # Se um ponto foi selecionado, realiza o rastreamento óptico
-    if selected_point is True:
-        # Desenha o ponto selecionado no quadro
-        cv2.circle(frame, point, 5, (0, 0, 255), 2)
-
-        # Calcula o fluxo óptico entre os quadros
-        new_points, status, errors = cv2.calcOpticalFlowPyrLK(frame_gray_init,
-                                                              frame_gray,
-                                                              old_points,
-                                                              None,
-                                                              **parameters_lucas_kanade)
-        # Atualiza o quadro de referência e os pontos antigos
-        frame_gray_init = frame_gray.copy()
-        old_points = new_points
-
-        # Obtém as coordenadas dos pontos atuais e antigos
-        x, y = new_points.ravel()
-        j, k = old_points.ravel()
-
-        # Desenha uma linha indicando o vetor do fluxo óptico
-        mask = cv2.line(mask, (int(x), int(y)), (int(j), int(k)), (0, 255, 255), 2)
-        
-        # Desenha um círculo nos pontos de interesse
-        frame = cv2.circle(frame, (int(x), int(y)), 5, (0, 255, 0), -1)
-
-    # Combina o quadro original com a máscara para visualização
-    img = cv2.add(frame, mask)
-
-    # Exibe o quadro resultante e a máscara
-    cv2.imshow("Frame", img) # imagem concatenada
-    cv2.imshow("Frame 2", mask) # Fundo escuro
+    if not ret:
+        break
+
+    # Rastreia todos os pontos de uma vez e registra as novas posições (os pontos que não passam na verificação de
+    # ida e volta são removidos pelo rastreador)
+    ids, points = tracker.update(frame)
+    trajectories.update(ids, points)
+
+    # Desenha um círculo nos pontos de interesse
+    for point_id, (x, y) in zip(ids, points):
+        cv2.circle(frame, (int(x), int(y)), 5, colors[point_id % len(colors)].tolist(), -1)
+
+    # Desenha os rastros sobre o quadro e sobre o fundo escuro
+    img = trajectories.render(frame.copy(), colors=colors)
+    trail_canvas[:] = 0
+    trajectories.render(trail_canvas, colors=colors)
+
+    # Exibe o quadro resultante e os rastros
+    cv2.imshow("Frame", img) # imagem com os rastros
+    cv2.imshow("Frame 2", trail_canvas) # Fundo escuro
     cv2.imshow("Frame 3", frame) # imagem Original
 
-    # Aguarda a tecla 'Esc' para encerrar o loop
+    # Aguarda a tecla 'Esc' para encerrar o loop ('c' remove todos os pontos)
     key = cv2.waitKey(1)
     if key == 27:
         break
+    if key == ord('c'):
+        tracker.remove(tracker.ids)
 
 # Libera os recursos e fecha as janelas
 cap.release()
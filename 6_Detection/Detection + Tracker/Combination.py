@@ -1,19 +1,49 @@
 # -------------------------------------------------------------------------------------------------------------------------------#
-# Detecção e astreamento de Objeto com OpenCV 
+# Detecção e astreamento de Objeto com OpenCV
 
 # O código abaixo é uma demonstração de  como detectar e rastrear um objeto em imagens utilizando a biblioteca Opencv, algoritmos esses:
 #  - Cascade fullbody
-#  - Tracker CSRT 
-#  - Tracker MOSSE
+#  - Tracker CSRT
+#
+# O `DetectionScheduler` (rastreamento/scheduler.py) roda o detector a cada N frames, ou antes quando o rastreador
+# falha, e apenas rastreia nos frames intermediários. N é ajustado a partir dos custos medidos do detector e do
+# rastreador para manter a média do tempo por frame dentro de `budget_ms`.
 # -------------------------------------------------------------------------------------------------------------------------------#
 
 # Importar as bibliotecas OpenCV e sys, além de randint do módulo random
+import os
 import cv2
 import sys
 from random import randint
 
-# Criar um objeto de rastreamento CSRT (Discriminative Correlation Filter with Channel and Spatial Reliability)
-tracker = cv2.TrackerCSRT_create()
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from rastreamento.boxes import iou
+from rastreamento.detection import detect_around
+from rastreamento.frame_context import FrameContext, ScaledTracker
+from rastreamento.postprocess import postprocess
+from rastreamento.prefetch import FramePrefetcher
+from rastreamento.scheduler import DetectionScheduler
+from rastreamento.trackers import create_tracker
+from rastreamento.video_writer import AsyncVideoWriter
+
+# Tipo de rastreador usado entre as detecções: CSRT (Discriminative Correlation Filter with Channel and Spatial Reliability)
+tracker_type = 'CSRT'
+
+# Os rastreadores são criados a cada detecção; um primeiro é criado aqui para encerrar o script com a mensagem do erro
+# quando o tipo não existe na instalação (ou, no GOTURN, faltam os arquivos do modelo)
+try:
+    create_tracker(tracker_type)
+except (RuntimeError, IOError) as error:
+    print(error)
+    sys.exit(1)
+
+# Orçamento médio de tempo por frame, em milissegundos
+budget_ms = 33.0
+
+# Escalas em que o rastreador e a busca do detector no frame inteiro trabalham (1.0 = resolução original).
+# As reduções são calculadas uma vez por frame pelo `FrameContext` e compartilhadas entre as etapas.
+tracking_scale = 1.0
+detection_scale = 1.0
 
 # Abrir um vídeo para rastreamento
 video = cv2.VideoCapture("videos/walking.avi")
@@ -23,64 +53,80 @@ if not video.isOpened():
     print("Não foi possível abrir o vídeo")
     sys.exit()
 
-# Ler o primeiro frame do vídeo
-ok, frame = video.read()
-if not ok:
-    print('Não é possível ler o arquivo de vídeo')
-    sys.exit()
+# Decodificar os próximos frames em outra thread enquanto o rastreador e o detector trabalham
+video = FramePrefetcher(video, depth=8)
+
+# Arquivo de vídeo onde os frames anotados são gravados em outra thread (None para não gravar) e intervalo entre os
+# frames gravados (1 grava todos)
+output_video = None
+output_every = 1
+writer = None
+if output_video:
+    writer = AsyncVideoWriter(output_video, fps=video.get(cv2.CAP_PROP_FPS) or 30.0, every=output_every)
 
 # Carregar o classificador em cascata para detecção de corpos inteiros
 cascade = cv2.CascadeClassifier('6_Detection/cascade/fullbody.xml')
 
-# Função para detectar corpos inteiros usando o classificador em cascata
-def detectar():
-    while True:
-        # Ler um novo frame do vídeo
-        ok, frame = video.read()
-        # Converter o frame para escala de cinza
-        frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        # Detectar corpos inteiros na imagem usando o classificador em cascata
-        detection = cascade.detectMultiScale(frame_gray)
-        # Desenhar retângulos ao redor das detecções na imagem
-        for (x, y, l, a) in detection:
-            cv2.rectangle(frame, (x, y), (x + l, y + a), (0, 0, 255), 2)
-            cv2.imshow("Deteção", frame)
-            # Verificar se a detecção foi realizada pelo classificador em cascata
-            if x > 0:
-                print('Detecção efetuada pelo haarcascade')
-                return x, y, l, a
-
-# Chamar a função de detecção e obter as coordenadas da detecção
-bbox = detectar()
-
-# Inicializar o rastreador com as coordenadas da detecção
-ok = tracker.init(frame, bbox)
+# Sobreposição mínima (IoU) entre uma detecção e a última posição conhecida para que ela seja considerada o mesmo objeto
+min_match_iou = 0.2
+
+# Função para detectar corpos inteiros usando o classificador em cascata.
+# Retorna uma detecção do frame ou `None`; `last_bbox` é a última posição conhecida do objeto.
+# Com a posição conhecida, a busca é feita primeiro em uma janela ao redor dela e em escalas próximas ao tamanho
+# anterior (`detect_around`), e o frame inteiro só é varrido se nada for encontrado ali. Entre as detecções,
+# é escolhida a que mais se sobrepõe à última posição; se nenhuma se sobrepõe pelo menos `min_match_iou`, a função
+# retorna `None` e o agendador mantém o rastreador atual, em vez de trocá-lo por outra pessoa.
+# `context` é o `FrameContext` do frame, que já guarda a conversão para escala de cinza.
+def detectar(context, last_bbox):
+    # Detectar corpos inteiros na imagem usando o classificador em cascata
+    detection = detect_around(cascade, context, last_bbox, fallback_scale=detection_scale)
+    # Remover detecções repetidas do mesmo objeto
+    detection, _ = postprocess(detection, iou_threshold=0.3)
+    # Verificar se a detecção foi realizada pelo classificador em cascata
+    detection = [tuple(int(v) for v in d) for d in detection if d[0] > 0]
+    if not detection:
+        return None
+    if last_bbox is not None:
+        # Apenas uma detecção sobre o mesmo objeto é aceita
+        detection = [max(detection, key=lambda d: iou(d, last_bbox))]
+        if iou(detection[0], last_bbox) < min_match_iou:
+            return None
+    print('Detecção efetuada pelo haarcascade')
+    return detection[0]
+
+# Criar o agendador de detecção e rastreamento
+scheduler = DetectionScheduler(detectar, lambda: ScaledTracker(create_tracker(tracker_type), tracking_scale),
+                               budget_ms=budget_ms)
+
 # Gerar uma cor aleatória para desenhar o retângulo de rastreamento
 colors = (randint(0, 255), randint(0, 255), randint(0, 255))
 
-# Loop principal de rastreamento
+# Loop principal de detecção e rastreamento
 while True:
     # Ler um novo frame do vídeo
     ok, frame = video.read()
     if not ok:
         break
 
-    # Atualizar o rastreador com o novo frame
-    ok, bbox = tracker.update(frame)
+    # Detectar ou rastrear o objeto, conforme o agendador. O mesmo contexto é usado pelo detector e pelo rastreador.
+    ok, bbox, detected = scheduler.process(FrameContext(frame))
 
-    # Verificar se o rastreamento foi bem-sucedido
+    # Verificar se o objeto foi encontrado neste frame
     if ok:
         # Converter os valores de ponto flutuante em inteiros e extrair as coordenadas
         (x, y, w, h) = [int(v) for v in bbox]
-        # Desenhar um retângulo ao redor do objeto rastreado
-        cv2.rectangle(frame, (x, y), (x + w, y + h), colors, 2, 1)
+        # Desenhar um retângulo ao redor do objeto (vermelho quando vindo do detector)
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 0, 255) if detected else colors, 2, 1)
     else:
-        # Em caso de falha no rastreamento, realizar detecção usando o classificador em cascata
-        print('Falha no rastreamento. Será executado o detector haarcascade')
-        bbox = detectar()
-        # Inicializar um novo rastreador (MOSSE neste caso) com as novas coordenadas
-        tracker = cv2.legacy.TrackerMOSSE_create()
-        tracker.init(frame, bbox)
+        cv2.putText(frame, 'Falha no rastreamento', (100, 80),
+                    cv2.FONT_HERSHEY_SIMPLEX, .75, (0, 0, 255), 2)
+
+    # Exibir o intervalo atual entre detecções
+    cv2.putText(frame, 'Deteccao a cada {} frames'.format(scheduler.interval), (100, 20),
+                cv2.FONT_HERSHEY_SIMPLEX, .75, (50, 170, 50), 2)
+
+    if writer is not None:
+        writer.write(frame)
 
     # Exibir o frame com o retângulo de rastreamento
     cv2.imshow("Tracking", frame)
@@ -88,4 +134,8 @@ while True:
     # Aguardar até que uma tecla seja pressionada (27 corresponde à tecla 'ESC') e encerrar o loop se necessário
     k = cv2.waitKey(1) & 0XFF
     if k == 27:
-        break
\ No newline at end of file
+        break
+
+video.release()
+if writer is not None:
+    writer.release()
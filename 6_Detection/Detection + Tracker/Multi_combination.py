@@ -0,0 +1,108 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Detecção e Rastreamento de Múltiplos Objetos com OpenCV
+
+# Versão de `Combination.py` para várias pessoas ao mesmo tempo. O detector (cascade fullbody) roda a cada
+# `detect_every` frames e todas as detecções são associadas aos objetos rastreados pelo IoU com o algoritmo húngaro:
+# detecções novas ganham um rastreador, e objetos que deixam de ser detectados são retirados.
+# Entre as detecções, os rastreadores são atualizados em paralelo pelo `ParallelMultiTracker`.
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+# Importar as bibliotecas necessárias
+import os
+import cv2
+import sys
+from random import randint
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from rastreamento.detection import detect_scaled
+from rastreamento.pipeline import MultiObjectPipeline
+from rastreamento.postprocess import postprocess
+from rastreamento.prefetch import FramePrefetcher
+from rastreamento.trackers import create_tracker
+from rastreamento.video_writer import AsyncVideoWriter
+
+# Tipo de rastreador e intervalo (em frames) entre as detecções
+tracker_type = 'KCF'
+detect_every = 10
+
+# Os rastreadores são criados a cada detecção; um primeiro é criado aqui para encerrar o script com a mensagem do erro
+# quando o tipo não existe na instalação (ou, no GOTURN, faltam os arquivos do modelo)
+try:
+    create_tracker(tracker_type)
+except (RuntimeError, IOError) as error:
+    print(error)
+    sys.exit(1)
+
+# Abrir um vídeo para rastreamento
+video = cv2.VideoCapture("videos/walking.avi")
+
+# Verificar se o vídeo foi aberto corretamente
+if not video.isOpened():
+    print("Não foi possível abrir o vídeo")
+    sys.exit()
+
+# Decodificar os próximos frames em outra thread enquanto o rastreador e o detector trabalham
+video = FramePrefetcher(video, depth=8)
+
+# Arquivo de vídeo onde os frames anotados são gravados em outra thread (None para não gravar) e intervalo entre os
+# frames gravados (1 grava todos)
+output_video = None
+output_every = 1
+writer = None
+if output_video:
+    writer = AsyncVideoWriter(output_video, fps=video.get(cv2.CAP_PROP_FPS) or 30.0, every=output_every)
+
+# Carregar o classificador em cascata para detecção de corpos inteiros
+cascade = cv2.CascadeClassifier('6_Detection/cascade/fullbody.xml')
+
+# Função para detectar corpos inteiros usando o classificador em cascata.
+# Retorna todas as detecções do frame, sem as repetidas (cada objeto precisa gerar uma única detecção para
+# não receber dois rastreadores).
+def detectar(frame):
+    detections, scores = detect_scaled(cascade, cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), with_scores=True)
+    return postprocess(detections, scores, iou_threshold=0.3)[0]
+
+# Criar o pipeline de detecção e rastreamento
+pipeline = MultiObjectPipeline(detectar, lambda: create_tracker(tracker_type),
+                               detect_every=detect_every, max_misses=2, max_failures=detect_every)
+
+# Cores por id de objeto, geradas quando o objeto aparece
+colors = {}
+
+# Loop principal de detecção e rastreamento
+while True:
+    ok, frame = video.read()
+    if not ok:
+        break
+
+    tracks = pipeline.process(frame)
+
+    for track in pipeline.retired:
+        print('Objeto {} retirado'.format(track.id))
+
+    # Desenhar os objetos encontrados neste frame
+    for track in tracks:
+        if not track.ok:
+            continue
+        color = colors.setdefault(track.id, (randint(0, 255), randint(0, 255), randint(0, 255)))
+        (x, y, w, h) = [int(v) for v in track.bbox]
+        cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2, 1)
+        cv2.putText(frame, str(track.id), (x, y - 5), cv2.FONT_HERSHEY_SIMPLEX, .5, color, 2)
+
+    cv2.putText(frame, 'Objetos: {}'.format(len(tracks)), (100, 20),
+                cv2.FONT_HERSHEY_SIMPLEX, .75, (50, 170, 50), 2)
+
+    if writer is not None:
+        writer.write(frame)
+
+    cv2.imshow("Tracking", frame)
+
+    # Aguardar até que uma tecla seja pressionada (27 corresponde à tecla 'ESC') e encerrar o loop se necessário
+    k = cv2.waitKey(1) & 0XFF
+    if k == 27:
+        break
+
+pipeline.close()
+video.release()
+if writer is not None:
+    writer.release()
@@ -0,0 +1,43 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Detecção com vários classificadores em cascata
+
+# Este código usa o `CascadeDetector` (rastreamento/cascades.py) para rodar vários modelos da pasta `cascade/` sobre
+# a mesma imagem: os modelos de `labels` rodam em paralelo no frame inteiro, sobre uma única conversão para escala de
+# cinza equalizada, e os olhos são procurados apenas dentro dos rostos encontrados.
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+# Importar as bibliotecas necessárias
+import os
+import sys
+import time
+import cv2
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from rastreamento.cascades import CascadeDetector
+
+# Modelos executados no frame inteiro e cores de cada modelo
+labels = ['face', 'fullbody', 'upperbody']
+colors = {'face': (0, 255, 0), 'eye': (255, 255, 0), 'fullbody': (0, 0, 255),
+          'upperbody': (255, 0, 0), 'lowerbody': (0, 255, 255)}
+
+# Carregar a imagem a ser processada
+image = cv2.imread('imagens/pessoas.jpg')
+
+# Carregar os modelos uma única vez e detectar
+with CascadeDetector(labels, nested={'eye': 'face'}) as detector:
+    start = time.perf_counter()
+    detections = detector.detect(image)
+    print('Detecção em {:.1f} ms'.format((time.perf_counter() - start) * 1000))
+
+# Imprimir e desenhar as detecções
+for detection in detections:
+    print(detection)
+    (x, y, l, a) = detection.bbox
+    cv2.rectangle(image, (x, y), (x + l, y + a), colors[detection.label], 2)
+
+# Exibir a imagem com os retângulos das detecções
+cv2.imshow("Detections", image)
+
+# Aguardar até que uma tecla seja pressionada e então fechar a janela
+cv2.waitKey(0)
+cv2.destroyAllWindows()
@@ -1,18 +1,46 @@
 # Importar a biblioteca OpenCV
+import os
+import sys
 import cv2
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from rastreamento.detection import TiledDetector, detect_scaled
+from rastreamento.frame_context import FrameContext
+from rastreamento.postprocess import postprocess
+
+# Escala em que a detecção é feita (1.0 = resolução original). Em imagens grandes, reduzir a entrada
+# corta o custo de todos os níveis da pirâmide interna do `detectMultiScale`.
+detection_scale = 1.0
+
+# Detecção em blocos paralelos, para imagens de alta resolução (4K, câmeras de vigilância). A sobreposição entre os
+# blocos deve ser maior que os objetos procurados; objetos maiores são encontrados em uma passada na imagem reduzida.
+tiled = False
+tile_size, tile_overlap = 640, 160
+
+# Pós-processamento: tamanhos mínimo e máximo aceitos (largura, altura) e limiar de IoU para remover duplicatas
+min_size, max_size = None, None
+iou_threshold = 0.3
+
 # Carregar a imagem a ser processada
 image = cv2.imread('imagens/pessoas.jpg')
 
 # Carregar o classificador em cascata para detecção de corpos inteiros
-detector = cv2.CascadeClassifier('Detection/cascade/fullbody.xml')
+cascade_path = '6_Detection/cascade/fullbody.xml'
+detector = cv2.CascadeClassifier(cascade_path)
 
-# Converter a imagem para escala de cinza
-image_gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-# cv2.imshow("Pessoas", image_gray)  
+# Criar o contexto do frame, que converte a imagem para escala de cinza (e reduz a escala) uma única vez
+context = FrameContext(image)
+# cv2.imshow("Pessoas", context.gray)
 
 # Detectar corpos inteiros na imagem usando o classificador em cascata
-detections = detector.detectMultiScale(image_gray)
+if tiled:
+    with TiledDetector(cascade_path, tile_size=tile_size, overlap=tile_overlap) as tiled_detector:
+        detections, scores = tiled_detector.detect(context), None
+else:
+    detections, scores = detect_scaled(detector, context, detection_scale, with_scores=True)
+
+# Remover detecções repetidas e de tamanhos fora do intervalo
+detections, scores = postprocess(detections, scores, min_size, max_size, iou_threshold)
 
 # Imprimir as coordenadas e dimensões das detecções
 print(detections)
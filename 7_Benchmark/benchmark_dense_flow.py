@@ -0,0 +1,133 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Benchmark do optical flow denso: precisão contra FPS
+
+# Este script mede as configurações do `DenseFlow` (`rastreamento/dense_flow.py`) em sequências sintéticas geradas
+# por `rastreamento/synthetic.py`. Para cada combinação de escala de processamento, reaproveitamento do fluxo anterior e
+# modo ROI são reportados:
+#  - latência do `update()` nos percentis 50 e 95 (ms), incluindo redução e ampliação, e FPS
+#  - EPE: erro médio de ponto final (pixels) contra o fluxo de referência, calculado na resolução original sem
+#    estimativa inicial (a configuração original do `Optical_flow_dense.py`)
+#  - erro de movimento do objeto: diferença (pixels) entre a mediana do fluxo dentro da caixa verdadeira e o
+#    deslocamento real do centro do objeto
+#
+# No modo ROI a região de interesse é a caixa verdadeira do frame anterior, como se viesse de um rastreador; o EPE é
+# medido apenas dentro dela.
+#   python 7_Benchmark/benchmark_dense_flow.py --frames 300 --scales 1 0.5 0.25 --output benchmark_dense_flow.json
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from rastreamento.dense_flow import DenseFlow
+from rastreamento.synthetic import moving_object_sequence
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Fluxo de referência de todos os pares de frames consecutivos
+def reference_flows(grays):
+    engine = DenseFlow(scale=1.0, reuse_flow=False)
+    engine.update(grays[0])
+    return [engine.update(gray) for gray in grays[1:]]
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Medir uma configuração
+def run_config(grays, boxes, references, scale, reuse_flow, roi):
+    engine = DenseFlow(scale=scale, reuse_flow=reuse_flow)
+    engine.update(grays[0])
+
+    latencies, epes, motion_errors = [], [], []
+    for i in range(1, len(grays)):
+        x, y, w, h = boxes[i - 1]
+        rois = [boxes[i - 1]] if roi else None
+
+        start = time.perf_counter()
+        flow = engine.update(grays[i], rois)
+        latencies.append(time.perf_counter() - start)
+
+        # EPE contra a referência (dentro da ROI no modo ROI)
+        diff = flow - references[i - 1]
+        if roi:
+            diff = diff[y:y + h, x:x + w]
+        epes.append(float(np.mean(np.linalg.norm(diff, axis=2))))
+
+        # O fluxo é definido nos pixels do frame anterior: a mediana dentro da caixa anterior estima o deslocamento
+        nx, ny, nw, nh = boxes[i]
+        truth = np.array([nx + nw / 2 - (x + w / 2), ny + nh / 2 - (y + h / 2)])
+        motion = np.median(flow[y:y + h, x:x + w].reshape(-1, 2), axis=0)
+        motion_errors.append(float(np.linalg.norm(motion - truth)))
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'scale': scale,
+        'reuse_flow': reuse_flow,
+        'roi': roi,
+        'latency_ms': {
+            'mean': float(latencies_ms.mean()),
+            'p50': float(np.percentile(latencies_ms, 50)),
+            'p95': float(np.percentile(latencies_ms, 95)),
+        },
+        'fps': float(latencies_ms.size / (latencies_ms.sum() / 1000)),
+        'epe': float(np.mean(epes)),
+        'motion_error': float(np.mean(motion_errors)),
+    }
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Exibir os resultados em forma de tabela
+def print_table(results):
+    print('{:>6} {:>7} {:>5} {:>8} {:>8} {:>8} {:>7} {:>10}'.format(
+        'Escala', 'Reuso', 'ROI', 'p50 ms', 'p95 ms', 'FPS', 'EPE', 'Erro obj.'))
+    for r in results:
+        print('{:>6.2f} {:>7} {:>5} {:>8.2f} {:>8.2f} {:>8.1f} {:>7.3f} {:>10.3f}'.format(
+            r['scale'], 'sim' if r['reuse_flow'] else 'não', 'sim' if r['roi'] else 'não',
+            r['latency_ms']['p50'], r['latency_ms']['p95'], r['fps'], r['epe'], r['motion_error']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark do optical flow denso em sequências sintéticas')
+    parser.add_argument('--frames', type=int, default=300,
+                        help='Frames da sequência (mais frames = movimento mais lento)')
+    parser.add_argument('--size', type=int, nargs=2, default=(640, 480), metavar=('W', 'H'),
+                        help='Tamanho dos frames')
+    parser.add_argument('--scales', type=float, nargs='+', default=(1.0, 0.5, 0.25),
+                        help='Escalas de processamento a medir')
+    parser.add_argument('--seed', type=int, default=0, help='Semente da sequência sintética')
+    parser.add_argument('--output', default='benchmark_dense_flow.json', help='Arquivo JSON de saída')
+    args = parser.parse_args()
+
+    frames, boxes = moving_object_sequence(args.frames, size=tuple(args.size), seed=args.seed)
+    grays = [cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in frames]
+
+    print('Calculando o fluxo de referência...', file=sys.stderr)
+    references = reference_flows(grays)
+
+    results = []
+    for scale, reuse_flow, roi in itertools.product(args.scales, (False, True), (False, True)):
+        print('Medindo escala {} (reuso: {}, ROI: {})...'.format(scale, reuse_flow, roi), file=sys.stderr)
+        results.append(run_config(grays, boxes, references, scale, reuse_flow, roi))
+
+    print_table(results)
+
+    report = {
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'parameters': {'frames': args.frames, 'size': list(args.size), 'seed': args.seed},
+        'results': results,
+    }
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2)
+    print('Resultados salvos em {}'.format(args.output), file=sys.stderr)
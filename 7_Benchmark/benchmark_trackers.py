@@ -0,0 +1,163 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Benchmark dos rastreadores do OpenCV
+
+# Este script mede todos os tipos de rastreadores do registro (`rastreamento/trackers.py`) em sequências sintéticas
+# geradas por `rastreamento/synthetic.py`, sem depender de vídeos externos nem de GPU. Para cada rastreador são
+# reportados:
+#  - latência do `tracker.update()` nos percentis 50, 95 e 99 (ms)
+#  - vazão (frames por segundo considerando apenas o `update()`)
+#  - crescimento do pico de memória residente (RSS) durante o rastreamento
+#  - IoU médio contra o gabarito e taxa de sucesso (IoU >= 0.5)
+#
+# Cada rastreador roda em um processo próprio, para que o pico de memória de um não contamine o do outro. Os frames são
+# gerados sob demanda, um de cada vez, e o RSS de referência é lido depois do primeiro frame e antes do `init()`: assim
+# o crescimento reportado é o do rastreador, e não o de um buffer com a sequência inteira.
+# O resultado é salvo em JSON junto com as versões do OpenCV e do NumPy, para comparar regressões entre versões:
+#   python 7_Benchmark/benchmark_trackers.py --frames 300 --sequences 3 --output benchmark_trackers.json
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from rastreamento.boxes import iou
+from rastreamento.synthetic import iter_moving_object_sequence
+from rastreamento.trackers import TRACKERS, available_trackers, create_tracker
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Pico de memória residente do processo atual, em MB (None quando não disponível na plataforma)
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # No Linux o valor vem em KB e no macOS em bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Medir um rastreador
+
+# Executado em um processo separado. Gera as sequências, rastreia cada uma a partir da caixa verdadeira do primeiro
+# frame e devolve as métricas agregadas de todas as sequências.
+def run_tracker(tracker_type, n_frames, n_sequences, size):
+    latencies = []
+    ious = []
+    init_times = []
+    baseline_rss = None
+
+    for seed in range(n_sequences):
+        sequence = iter_moving_object_sequence(n_frames, size=size, seed=seed)
+        first_frame, first_box = next(sequence)
+
+        try:
+            tracker = create_tracker(tracker_type)
+        except (cv2.error, IOError, RuntimeError) as error:
+            # O GOTURN, por exemplo, falha na criação quando os arquivos do modelo não estão no diretório, e os tipos
+            # pedidos em `--trackers` podem não existir na instalação
+            return {'tracker': tracker_type, 'error': str(error).strip().splitlines()[-1]}
+
+        # Referência: processo já com o OpenCV carregado e um frame gerado, antes de o rastreador alocar memória
+        if baseline_rss is None:
+            baseline_rss = peak_rss_mb()
+
+        start = time.perf_counter()
+        tracker.init(first_frame, first_box)
+        init_times.append(time.perf_counter() - start)
+
+        for frame, truth in sequence:
+            start = time.perf_counter()
+            ok, bbox = tracker.update(frame)
+            latencies.append(time.perf_counter() - start)
+            ious.append(iou(bbox, truth) if ok else 0.0)
+
+    latencies_ms = np.array(latencies) * 1000
+    ious = np.array(ious)
+    peak_rss = peak_rss_mb()
+    return {
+        'tracker': tracker_type,
+        'cost': TRACKERS[tracker_type].cost,
+        'accuracy': TRACKERS[tracker_type].accuracy,
+        'frames': int(latencies_ms.size),
+        'init_ms': float(np.mean(init_times) * 1000),
+        'latency_ms': {
+            'mean': float(latencies_ms.mean()),
+            'p50': float(np.percentile(latencies_ms, 50)),
+            'p95': float(np.percentile(latencies_ms, 95)),
+            'p99': float(np.percentile(latencies_ms, 99)),
+        },
+        'fps': float(latencies_ms.size / (latencies_ms.sum() / 1000)),
+        'peak_rss_mb': peak_rss,
+        'tracking_rss_mb': None if peak_rss is None else peak_rss - baseline_rss,
+        'iou_mean': float(ious.mean()),
+        'success_rate': float((ious >= 0.5).mean()),
+    }
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Exibir os resultados em forma de tabela
+def print_table(results):
+    print('{:<11} {:>8} {:>8} {:>8} {:>9} {:>9} {:>6} {:>8}'.format(
+        'Rastreador', 'p50 ms', 'p95 ms', 'p99 ms', 'FPS', '+RSS MB', 'IoU', 'Sucesso'))
+    for r in results:
+        if 'error' in r:
+            print('{:<11} {}'.format(r['tracker'], r['error']))
+            continue
+        rss = '-' if r['tracking_rss_mb'] is None else '{:.1f}'.format(r['tracking_rss_mb'])
+        print('{:<11} {:>8.2f} {:>8.2f} {:>8.2f} {:>9.1f} {:>9} {:>6.2f} {:>7.0%}'.format(
+            r['tracker'], r['latency_ms']['p50'], r['latency_ms']['p95'], r['latency_ms']['p99'],
+            r['fps'], rss, r['iou_mean'], r['success_rate']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark dos rastreadores do OpenCV em sequências sintéticas')
+    parser.add_argument('--trackers', nargs='+', default=None,
+                        help='Tipos de rastreadores a medir (padrão: todos os disponíveis)')
+    parser.add_argument('--frames', type=int, default=300, help='Frames por sequência')
+    parser.add_argument('--sequences', type=int, default=3, help='Quantidade de sequências (sementes)')
+    parser.add_argument('--size', type=int, nargs=2, default=(640, 480), metavar=('W', 'H'),
+                        help='Tamanho dos frames')
+    parser.add_argument('--output', default='benchmark_trackers.json', help='Arquivo JSON de saída')
+    args = parser.parse_args()
+
+    tracker_types = [t.upper() for t in args.trackers] if args.trackers else available_trackers()
+
+    # Um processo novo por rastreador, um de cada vez, para não disputar núcleos durante a medição
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for tracker_type in tracker_types:
+        print('Medindo {}...'.format(tracker_type), file=sys.stderr)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            results.append(executor.submit(run_tracker, tracker_type, args.frames,
+                                           args.sequences, tuple(args.size)).result())
+
+    print_table(results)
+
+    report = {
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'parameters': {'frames': args.frames, 'sequences': args.sequences, 'size': list(args.size)},
+        'results': results,
+    }
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2)
+    print('Resultados salvos em {}'.format(args.output), file=sys.stderr)
@@ -0,0 +1,7 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Pacote rastreamento
+
+# Código compartilhado entre os scripts das pastas numeradas (0_Single_Tracking, 1_Multi_Tracking, ...).
+# Os scripts continuam sendo executados a partir da raiz do repositório, por exemplo:
+#   python 0_Single_Tracking/single_tracking.py
+# -------------------------------------------------------------------------------------------------------------------------------#
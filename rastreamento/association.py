@@ -0,0 +1,115 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Associação entre detecções e objetos rastreados
+
+# Uma única execução do detector encontra todos os alvos do frame. Para aproveitar todas as detecções, cada uma precisa
+# ser associada ao objeto rastreado correspondente: a matriz de custo (1 - IoU) entre caixas rastreadas e detectadas é
+# calculada de forma vetorizada e a associação ótima é encontrada pelo algoritmo húngaro. Pares com IoU abaixo do
+# limiar não são associados.
+#
+# Quando o SciPy está instalado, `scipy.optimize.linear_sum_assignment` é usado; caso contrário, uma implementação
+# própria em NumPy do mesmo algoritmo (O(n³), mais que suficiente para dezenas de objetos).
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+import numpy as np
+
+from rastreamento.boxes import iou_matrix
+
+try:
+    from scipy.optimize import linear_sum_assignment as _scipy_assignment
+except ImportError:
+    _scipy_assignment = None
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Algoritmo húngaro em NumPy
+
+# Caminhos aumentantes mais curtos com potenciais (versão de Jonker-Volgenant), para uma matriz N x M com N <= M.
+# Retorna, para cada linha, a coluna atribuída.
+def _hungarian(cost):
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.intp)    # p[j]: linha (1-indexada) atribuída à coluna j
+    way = np.zeros(m + 1, dtype=np.intp)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = np.flatnonzero(~used[1:]) + 1
+            reduced = cost[i0 - 1, free - 1] - u[i0] - v[free]
+            better = reduced < minv[free]
+            minv[free[better]] = reduced[better]
+            way[free[better]] = j0
+
+            j1 = free[np.argmin(minv[free])]
+            delta = minv[j1]
+            visited = np.flatnonzero(used)
+            u[p[visited]] += delta
+            v[visited] -= delta
+            minv[free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+
+        # Inverte o caminho aumentante
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    assignment = np.empty(n, dtype=np.intp)
+    columns = np.flatnonzero(p[1:])
+    assignment[p[columns + 1] - 1] = columns
+    return assignment
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Atribuição de custo mínimo
+
+# Mesma interface de `scipy.optimize.linear_sum_assignment`: retorna (linhas, colunas) do emparelhamento de menor
+# custo total em uma matriz retangular qualquer.
+def linear_sum_assignment(cost):
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.size == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    if _scipy_assignment is not None:
+        return _scipy_assignment(cost)
+
+    if cost.shape[0] <= cost.shape[1]:
+        columns = _hungarian(cost)
+        return np.arange(cost.shape[0]), columns
+
+    rows = _hungarian(cost.T)
+    order = np.argsort(rows)
+    return rows[order], order
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Associar detecções aos objetos rastreados
+
+# `track_boxes` (N x 4) e `detections` (M x 4) no formato (x, y, w, h). Retorna (matches, unmatched_tracks,
+# unmatched_detections): `matches` é uma lista de pares (índice do objeto, índice da detecção) e as outras duas
+# listas contêm os índices que ficaram sem par.
+def associate(track_boxes, detections, iou_threshold=0.3):
+    track_boxes = np.asarray(track_boxes, dtype=np.float64).reshape(-1, 4)
+    detections = np.asarray(detections, dtype=np.float64).reshape(-1, 4)
+
+    if len(track_boxes) == 0 or len(detections) == 0:
+        return [], list(range(len(track_boxes))), list(range(len(detections)))
+
+    ious = iou_matrix(track_boxes, detections)
+    rows, columns = linear_sum_assignment(1.0 - ious)
+
+    accepted = ious[rows, columns] >= iou_threshold
+    matches = [(int(r), int(c)) for r, c in zip(rows[accepted], columns[accepted])]
+    matched_tracks = {r for r, _ in matches}
+    matched_detections = {c for _, c in matches}
+    unmatched_tracks = [i for i in range(len(track_boxes)) if i not in matched_tracks]
+    unmatched_detections = [j for j in range(len(detections)) if j not in matched_detections]
+    return matches, unmatched_tracks, unmatched_detections
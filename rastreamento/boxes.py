@@ -0,0 +1,67 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Operações com caixas delimitadoras
+
+# As caixas seguem o formato usado pelo OpenCV nos rastreadores e no `detectMultiScale`: (x, y, w, h).
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+import cv2
+import numpy as np
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Intersecção sobre união (IoU)
+
+# Retorna a razão entre a área de intersecção e a área de união de duas caixas, de 0 (sem sobreposição) a 1 (iguais)
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = min(ax + aw, bx + bw) - max(ax, bx)
+    ih = min(ay + ah, by + bh) - max(ay, by)
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    intersection = iw * ih
+    union = aw * ah + bw * bh - intersection
+    return float(intersection / union) if union > 0 else 0.0
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Matriz de IoU
+
+# Calcula, de forma vetorizada com NumPy, o IoU entre cada caixa de `a` (N x 4) e cada caixa de `b` (M x 4).
+# Retorna uma matriz N x M; é usada na associação entre detecções e objetos rastreados.
+def iou_matrix(a, b):
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)
+
+    ax0, ay0 = a[:, 0:1], a[:, 1:2]
+    ax1, ay1 = ax0 + a[:, 2:3], ay0 + a[:, 3:4]
+    bx0, by0 = b[:, 0], b[:, 1]
+    bx1, by1 = bx0 + b[:, 2], by0 + b[:, 3]
+
+    iw = np.clip(np.minimum(ax1, bx1) - np.maximum(ax0, bx0), 0, None)
+    ih = np.clip(np.minimum(ay1, by1) - np.maximum(ay0, by0), 0, None)
+    intersection = iw * ih
+    union = a[:, 2:3] * a[:, 3:4] + b[:, 2] * b[:, 3] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Supressão de não-máximos (NMS)
+
+# Remove caixas duplicadas: percorre as caixas da maior para a menor pontuação e descarta as que têm IoU acima de
+# `iou_threshold` com alguma caixa já mantida. Sem `scores`, as caixas maiores têm prioridade. O laço guloso roda em C++
+# no `cv2.dnn.NMSBoxes`, que só compara cada caixa com as já mantidas, sem montar a matriz de IoU entre todas elas.
+# Como o `NMSBoxes` descarta pontuações nulas e usa float32, ele recebe a posição de cada caixa na ordenação (a
+# primeira vale N, a última 1) em vez da pontuação: os empates continuam resolvidos pela ordem original.
+# Retorna os índices mantidos, em ordem de pontuação.
+def nms(boxes, scores=None, iou_threshold=0.5):
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.intp)
+    scores = boxes[:, 2] * boxes[:, 3] if scores is None else np.asarray(scores, dtype=np.float64)
+    order = np.argsort(-scores, kind='stable')
+
+    ranks = np.empty(len(boxes), dtype=np.float32)
+    ranks[order] = np.arange(len(boxes), 0, -1)
+    keep = cv2.dnn.NMSBoxes(boxes, ranks, 0.0, float(iou_threshold))
+    return np.asarray(keep, dtype=np.intp).reshape(-1)
@@ -0,0 +1,136 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Serviço de detecção com vários classificadores em cascata
+
+# A pasta `6_Detection/cascade/` traz cinco modelos Haar: fullbody, upperbody, lowerbody, frontalface e eye. A classe
+# `CascadeDetector` carrega os modelos escolhidos uma única vez e os executa em paralelo (um por thread, já que o
+# OpenCV libera o GIL dentro do `detectMultiScale`) sobre a mesma imagem em escala de cinza equalizada, preparada uma
+# vez por frame pelo `FrameContext`. Modelos aninhados, como os olhos, rodam apenas dentro das caixas do modelo pai
+# (os rostos), o que é muito mais barato que uma varredura do frame inteiro.
+#
+# O resultado é uma única lista de `Detection`, cada uma com o nome do modelo que a gerou.
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from rastreamento.frame_context import FrameContext
+from rastreamento.postprocess import postprocess
+
+# Pasta dos modelos que acompanham o repositório
+CASCADE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '6_Detection', 'cascade')
+
+# Arquivo e parâmetros padrão do `detectMultiScale` de cada modelo
+CASCADES = {
+    'fullbody':  ('fullbody.xml', {}),
+    'upperbody': ('haarcascade_upperbody.xml', {}),
+    'lowerbody': ('haarcascade_lowerbody.xml', {}),
+    'face':      ('haarcascade_frontalface_default.xml', {'scaleFactor': 1.1, 'minNeighbors': 5}),
+    'eye':       ('haarcascade_eye.xml', {'scaleFactor': 1.1, 'minNeighbors': 5}),
+}
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Detecção tipada
+
+# `label` é o nome do modelo, `bbox` a caixa (x, y, w, h) em coordenadas do frame, `score` a quantidade de vizinhos
+# da detecção (`detectMultiScale2`) e `parent` o índice da detecção pai na mesma lista (apenas para modelos aninhados)
+class Detection:
+
+    def __init__(self, label, bbox, score=1.0, parent=None):
+        self.label = label
+        self.bbox = bbox
+        self.score = score
+        self.parent = parent
+
+    def __repr__(self):
+        return 'Detection({!r}, {}, score={:g}, parent={})'.format(self.label, self.bbox, self.score, self.parent)
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Carregar um modelo
+
+# Gera `IOError` quando o arquivo não existe ou não pode ser lido pelo OpenCV
+def load_cascade(label, cascade_dir=CASCADE_DIR):
+    if label not in CASCADES:
+        raise ValueError('Modelo desconhecido: {!r}. Os modelos disponíveis são: {}'.format(label, ', '.join(CASCADES)))
+    path = os.path.join(cascade_dir, CASCADES[label][0])
+    cascade = cv2.CascadeClassifier(path)
+    if cascade.empty():
+        raise IOError('Não foi possível carregar o classificador em cascata: {}'.format(path))
+    return cascade
+
+
+class CascadeDetector:
+
+    # `labels` são os modelos executados no frame inteiro e `nested` relaciona cada modelo aninhado ao seu pai
+    # (por padrão, olhos dentro dos rostos; o pai precisa estar em `labels`). `params` permite sobrescrever os
+    # argumentos do `detectMultiScale` por modelo, por exemplo {'face': {'minNeighbors': 3}}.
+    # As detecções repetidas de cada modelo são removidas por NMS com o limiar `iou_threshold`.
+    def __init__(self, labels=('face', 'fullbody'), nested=None, params=None, cascade_dir=CASCADE_DIR, max_workers=None,
+                 iou_threshold=0.3):
+        self.labels = list(labels)
+        self.iou_threshold = iou_threshold
+        self.nested = {'eye': 'face'} if nested is None else dict(nested)
+        for child, parent in self.nested.items():
+            if parent not in self.labels:
+                raise ValueError('O modelo {!r} depende de {!r}, que não está em labels'.format(child, parent))
+
+        # Cada modelo é carregado uma única vez
+        self.cascades = {label: load_cascade(label, cascade_dir) for label in self.labels + list(self.nested)}
+        self.params = {label: dict(CASCADES[label][1]) for label in self.cascades}
+        for label, overrides in (params or {}).items():
+            self.params[label].update(overrides)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or len(self.cascades),
+                                            thread_name_prefix='CascadeDetector')
+
+    # Retorna (caixas, pontuações) de um modelo, já sem as repetidas
+    def _detect(self, label, gray):
+        detections, scores = self.cascades[label].detectMultiScale2(gray, **self.params[label])
+        return postprocess(detections, scores, iou_threshold=self.iou_threshold)
+
+    # Roda o modelo aninhado `label` dentro de cada caixa pai. As caixas de um mesmo modelo são processadas em
+    # sequência na mesma thread, pois um `CascadeClassifier` não pode ser usado por duas threads ao mesmo tempo.
+    def _detect_nested(self, label, gray, parents):
+        results = []
+        for parent_idx, (x, y, w, h) in parents:
+            for bbox, score in zip(*self._detect(label, gray[y:y + h, x:x + w])):
+                results.append((parent_idx, bbox + np.array([x, y, 0, 0], np.int32), score))
+        return results
+
+    # Detecta todos os modelos em `frame` (imagem BGR ou `FrameContext`) e retorna a lista de `Detection`,
+    # na ordem de `labels`, seguida das detecções aninhadas
+    def detect(self, frame):
+        context = frame if isinstance(frame, FrameContext) else FrameContext(frame)
+        gray = context.equalized
+
+        futures = [self._executor.submit(self._detect, label, gray) for label in self.labels]
+        detections = []
+        for label, future in zip(self.labels, futures):
+            boxes, scores = future.result()
+            detections.extend(Detection(label, tuple(int(v) for v in bbox), float(score))
+                              for bbox, score in zip(boxes, scores))
+
+        futures = []
+        for child, parent in self.nested.items():
+            parents = [(i, d.bbox) for i, d in enumerate(detections) if d.label == parent]
+            if parents:
+                futures.append((child, self._executor.submit(self._detect_nested, child, gray, parents)))
+        for child, future in futures:
+            detections.extend(Detection(child, tuple(int(v) for v in bbox), float(score), parent_idx)
+                              for parent_idx, bbox, score in future.result())
+
+        return detections
+
+    # Encerra as threads do pool
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,224 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Rastreador por histograma de cores (Meanshift / CAMshift)
+
+# Os scripts de Meanshift e CAMshift convertiam o frame inteiro para HSV e calculavam a retroprojeção (`calcBackProject`)
+# do frame inteiro a cada quadro, embora o `meanShift` só examine a vizinhança da janela atual. A classe
+# `ColorHistogramTracker`:
+#  - converte para HSV e retroprojeta apenas uma janela de busca, a janela do objeto ampliada `search_expand` vezes
+#  - opcionalmente atualiza o histograma do objeto a cada quadro (`learning_rate`), misturando exponencialmente o
+#    histograma da região rastreada (a caixa rotacionada no CAMshift), calculado apenas sobre essa região. Sob mudanças
+#    de iluminação a retroprojeção continua concentrada no objeto e o CAMshift não expande a janela (o que também
+#    aumentaria o custo por quadro).
+#  - expõe a interface `init()`/`update()` dos rastreadores do OpenCV, aceitando um frame BGR ou um `FrameContext`;
+#    com o contexto, a janela de busca é recortada do HSV do frame, convertido uma única vez e compartilhado
+#
+# A classe `MultiColorTracker` rastreia vários alvos de cor ao mesmo tempo: o frame é convertido para HSV uma única
+# vez, cada alvo é retroprojetado apenas na sua janela de busca e os alvos são processados em paralelo pelo
+# `ParallelMultiTracker`. O custo por quadro depende da área somada dos alvos.
+#
+# Assim o custo por quadro depende do tamanho do objeto, não do tamanho do frame. O histograma pode usar só a matiz
+# (`HISTOGRAMS['h']`, como nos scripts originais) ou matiz e saturação (`HISTOGRAMS['hs']`), que separa melhor o objeto
+# de fundos com a mesma matiz e pouca saturação.
+#
+# Observação: uma tabela BGR -> probabilidade pré-calculada (grade de 32x32x32 ou 64x64x64 cores) foi avaliada no
+# lugar da conversão para HSV, mas a indexação da tabela (em NumPy ou com um `calcBackProject` 3D) ficou de 2 a 5
+# vezes mais lenta que `cvtColor` + `calcBackProject` do OpenCV, que são vetorizados, além de perder precisão na matiz.
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+import cv2
+import numpy as np
+
+from rastreamento.detection import expand_bbox
+from rastreamento.frame_context import FrameContext
+from rastreamento.multitracker import ParallelMultiTracker
+
+MODES = ('meanshift', 'camshift')
+
+# Parâmetros do histograma (canais, quantidade de bins e intervalos) de matiz e de matiz + saturação
+HISTOGRAMS = {
+    'h':  {'channels': [0], 'bins': [180], 'ranges': [0, 180]},
+    'hs': {'channels': [0, 1], 'bins': [30, 32], 'ranges': [0, 180, 0, 256]},
+}
+
+
+class ColorHistogramTracker:
+
+    # `mode` é 'meanshift' (janela de tamanho fixo) ou 'camshift' (tamanho e orientação adaptativos). `channels`,
+    # `bins` e `ranges` definem o histograma HSV do objeto (por padrão, só a matiz, como nos scripts originais).
+    # `term_crit` é o critério de parada do `meanShift`/`CamShift`. `learning_rate` é o peso do histograma do quadro
+    # atual na atualização do modelo (0 mantém o histograma do primeiro quadro).
+    def __init__(self, mode='meanshift', channels=(0,), bins=(180,), ranges=(0, 180), search_expand=2.0,
+                 term_crit=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 1), learning_rate=0.0):
+        if mode not in MODES:
+            raise ValueError('Modo desconhecido: {!r}. Os modos disponíveis são: {}'.format(mode, ', '.join(MODES)))
+        self.mode = mode
+        self.channels = list(channels)
+        self.bins = list(bins)
+        self.ranges = list(ranges)
+        self.search_expand = search_expand
+        self.term_crit = term_crit
+        if not 0 <= learning_rate <= 1:
+            raise ValueError('learning_rate deve estar no intervalo [0, 1]: {}'.format(learning_rate))
+        self.learning_rate = learning_rate
+
+        self.hist = None
+        self.track_window = None
+        # Caixa rotacionada ((cx, cy), (w, h), ângulo) do CAMshift (no Meanshift, a janela com ângulo 0), em
+        # coordenadas do frame
+        self.rotated_box = None
+        # Janela de busca (x0, y0, x1, y1) e sua retroprojeção no último quadro, para visualização
+        self.search_window = None
+        self.back_projection = None
+
+    # Histograma normalizado (0-255) de uma imagem HSV, restrito à máscara quando informada
+    def _histogram(self, hsv, mask=None):
+        hist = cv2.calcHist([hsv], self.channels, mask, self.bins, self.ranges)
+        return cv2.normalize(hist, hist, 0, 255, cv2.NORM_MINMAX)
+
+    # Retroprojeção de uma imagem BGR com o histograma do objeto
+    def back_project(self, image):
+        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        return cv2.calcBackProject([hsv], self.channels, self.hist, self.ranges, 1)
+
+    # Mistura no modelo o histograma da região rastreada. `hsv` é a janela de busca já convertida, com origem
+    # (x0, y0); a região é a caixa rotacionada, recortada à janela de busca.
+    def _adapt(self, hsv, x0, y0):
+        (cx, cy), size, angle = self.rotated_box
+        points = cv2.boxPoints(((cx - x0, cy - y0), size, angle))
+
+        # Apenas o retângulo que contém a região é processado
+        height, width = hsv.shape[:2]
+        rx0, ry0 = np.clip(np.floor(points.min(axis=0)).astype(int), 0, [width, height])
+        rx1, ry1 = np.clip(np.ceil(points.max(axis=0)).astype(int) + 1, 0, [width, height])
+        if rx1 <= rx0 or ry1 <= ry0:
+            return
+        mask = np.zeros((ry1 - ry0, rx1 - rx0), dtype=np.uint8)
+        cv2.fillConvexPoly(mask, np.round(points - [rx0, ry0]).astype(np.int32), 255)
+
+        hist = self._histogram(hsv[ry0:ry1, rx0:rx1], mask)
+        self.hist = cv2.addWeighted(self.hist, 1 - self.learning_rate, hist, self.learning_rate, 0)
+
+    # Recorte HSV da região (x0, y0, x1, y1) de `frame` (imagem BGR ou `FrameContext`)
+    @staticmethod
+    def _hsv_region(frame, x0, y0, x1, y1):
+        if isinstance(frame, FrameContext):
+            return frame.hsv[y0:y1, x0:x1]
+        return cv2.cvtColor(frame[y0:y1, x0:x1], cv2.COLOR_BGR2HSV)
+
+    @staticmethod
+    def _window_box(window):
+        x, y, w, h = window
+        return (x + w / 2, y + h / 2), (w, h), 0.0
+
+    def init(self, frame, bbox):
+        bbox = tuple(int(v) for v in bbox)
+        x, y, w, h = bbox
+        self.track_window = bbox
+        self.rotated_box = self._window_box(bbox)
+        self.hist = self._histogram(self._hsv_region(frame, x, y, x + w, y + h))
+        return True
+
+    # Move a janela para a região mais parecida com o histograma do objeto dentro da janela de busca.
+    # `frame` é uma imagem BGR ou um `FrameContext`.
+    # Retorna (ok, bbox); `ok` é falso quando não há nenhum pixel com a cor do objeto na janela final.
+    def update(self, frame):
+        shape = frame.shape
+        x, y, w, h = self.track_window
+        if w <= 0 or h <= 0:
+            # Janela degenerada (o CAMshift perdeu o objeto): busca no frame inteiro
+            x0, y0, x1, y1 = 0, 0, shape[1], shape[0]
+            x, y, w, h = x0, y0, x1, y1
+        else:
+            x0, y0, x1, y1 = expand_bbox(self.track_window, self.search_expand, shape)
+
+        hsv = self._hsv_region(frame, x0, y0, x1, y1)
+        back_projection = cv2.calcBackProject([hsv], self.channels, self.hist, self.ranges, 1)
+        local_window = (x - x0, y - y0, w, h)
+        if self.mode == 'camshift':
+            rotated_box, local_window = cv2.CamShift(back_projection, local_window, self.term_crit)
+            (cx, cy), size, angle = rotated_box
+            self.rotated_box = ((cx + x0, cy + y0), size, angle)
+        else:
+            _, local_window = cv2.meanShift(back_projection, local_window, self.term_crit)
+
+        lx, ly, w, h = local_window
+        self.track_window = (lx + x0, ly + y0, w, h)
+        if self.mode == 'meanshift':
+            self.rotated_box = self._window_box(self.track_window)
+        self.search_window = (x0, y0, x1, y1)
+        self.back_projection = back_projection
+
+        ok = w > 0 and h > 0 and cv2.countNonZero(back_projection[ly:ly + h, lx:lx + w]) > 0
+        if ok and self.learning_rate > 0:
+            self._adapt(hsv, x0, y0)
+        return ok, self.track_window
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Vários alvos de cor
+
+class MultiColorTracker:
+
+    # `mode` e os demais argumentos nomeados (`channels`, `bins`, `ranges`, `search_expand`, `term_crit`,
+    # `learning_rate`) valem para todos os alvos. `max_workers`, `max_failures` e `min_confidence` são os do
+    # `ParallelMultiTracker`: alvos perdidos por tempo demais são removidos e ficam em `evicted`.
+    # `shared_hsv` escolhe entre converter o frame inteiro para HSV uma única vez (True) ou converter apenas a janela
+    # de busca de cada alvo (False). Com `None` a escolha é feita a cada quadro: o frame é convertido uma vez quando a
+    # área somada das janelas de busca passa da área do frame, e cada janela separadamente quando os alvos são poucos
+    # e pequenos.
+    def __init__(self, mode='camshift', max_workers=None, max_failures=None, min_confidence=None, shared_hsv=None,
+                 **params):
+        self.mode = mode
+        self.shared_hsv = shared_hsv
+        self.params = params
+        self._group = ParallelMultiTracker(max_workers, max_failures, min_confidence)
+
+    def __len__(self):
+        return len(self._group)
+
+    # `Track` de cada alvo (id, estado e o `ColorHistogramTracker` em `track.tracker`)
+    @property
+    def tracks(self):
+        return self._group.tracks
+
+    @property
+    def evicted(self):
+        return self._group.evicted
+
+    # Adiciona um alvo com a caixa `bbox` do frame e retorna o seu id
+    def add(self, frame, bbox):
+        self._group.add(ColorHistogramTracker(self.mode, **self.params), frame, bbox)
+        return self._group.tracks[-1].id
+
+    # Remove os alvos com os ids informados
+    def remove(self, track_ids):
+        return self._group.remove(track_ids)
+
+    # Verifica se vale a pena converter o frame inteiro para HSV
+    def _share_hsv(self, shape):
+        if self.shared_hsv is not None:
+            return self.shared_hsv
+        expand = self.params.get('search_expand', 2.0)
+        area = sum(t.tracker.track_window[2] * t.tracker.track_window[3] for t in self._group.tracks)
+        return area * expand ** 2 > shape[0] * shape[1]
+
+    # Atualiza todos os alvos com o frame (imagem BGR ou `FrameContext`) e retorna {id: caixa rotacionada}.
+    # Quando o HSV é compartilhado, ele é calculado antes de distribuir os alvos entre as threads, para ser convertido
+    # uma única vez.
+    def update(self, frame):
+        if len(self._group) and self._share_hsv(frame.shape):
+            frame = frame if isinstance(frame, FrameContext) else FrameContext(frame)
+            frame.hsv
+        elif isinstance(frame, FrameContext):
+            frame = frame.frame
+        self._group.update(frame)
+        return {track.id: track.tracker.rotated_box for track in self._group.tracks}
+
+    def close(self):
+        self._group.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,110 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Optical flow denso configurável
+
+# O `cv2.calcOpticalFlowFarneback` em cada frame inteiro é a operação mais cara do repositório. A classe `DenseFlow`
+# reduz esse custo de três formas:
+#  - `scale`: o fluxo é calculado na versão reduzida do frame (obtida do `FrameContext`) e ampliado para a resolução
+#    original, com os vetores multiplicados pelo mesmo fator. Com `scale=0.5` são 4x menos pixels.
+#  - `rois`: o fluxo é calculado apenas dentro das regiões de interesse (x, y, w, h), ampliadas para conter o
+#    deslocamento do objeto entre os frames; fora delas o fluxo é zero.
+#  - `reuse_flow`: o fluxo do frame anterior é usado como estimativa inicial (`cv2.OPTFLOW_USE_INITIAL_FLOW`), o que
+#    permite usar menos níveis de pirâmide e iterações para a mesma qualidade em movimentos contínuos.
+#
+# A troca entre precisão e FPS de cada configuração é medida por `7_Benchmark/benchmark_dense_flow.py`.
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+import time
+
+import cv2
+import numpy as np
+
+from rastreamento.detection import expand_bbox
+from rastreamento.frame_context import FrameContext
+
+
+class DenseFlow:
+
+    # `scale` é a escala de processamento (1.0 = resolução original). Os parâmetros do Farneback (`pyr_scale`,
+    # `levels`, `winsize`, `iterations`, `poly_n`, `poly_sigma`) valem para a imagem já reduzida. `roi_expand` é o
+    # fator de ampliação das regiões de interesse em torno do centro de cada uma. Com `upsample=False`, `update()`
+    # devolve o fluxo na resolução de processamento (vetores em pixels dessa resolução).
+    def __init__(self, scale=0.5, pyr_scale=0.5, levels=3, winsize=15, iterations=3, poly_n=5, poly_sigma=1.2,
+                 reuse_flow=True, upsample=True, roi_expand=2.0):
+        if not 0 < scale <= 1:
+            raise ValueError('scale deve estar no intervalo (0, 1]: {}'.format(scale))
+        self.scale = scale
+        self.params = (pyr_scale, levels, winsize, iterations, poly_n, poly_sigma)
+        self.reuse_flow = reuse_flow
+        self.upsample = upsample
+        self.roi_expand = roi_expand
+        # Tempo do último `calcOpticalFlowFarneback` (ms), sem a conversão e a ampliação
+        self.last_ms = 0.0
+        self.reset()
+
+    # Esquece o frame e o fluxo anteriores (por exemplo, após um corte de cena)
+    def reset(self):
+        self._prev = None
+        self._flow = None
+
+    # Com `OPTFLOW_USE_INITIAL_FLOW` o OpenCV escreve o resultado no próprio array da estimativa inicial. Ela é
+    # copiada para que o fluxo devolvido no frame anterior (que pode ser o mesmo array) não seja sobrescrito.
+    def _farneback(self, prev, gray, initial):
+        flags = 0
+        if initial is not None:
+            flags = cv2.OPTFLOW_USE_INITIAL_FLOW
+            initial = np.array(initial, dtype=np.float32, order='C')
+        return cv2.calcOpticalFlowFarneback(prev, gray, initial, *self.params, flags)
+
+    # Converte as regiões de interesse para fatias da imagem reduzida, ampliadas e limitadas à imagem
+    def _roi_slices(self, rois, shape):
+        slices = []
+        for bbox in rois:
+            bbox = [v * self.scale for v in bbox]
+            x0, y0, x1, y1 = expand_bbox(bbox, self.roi_expand, shape)
+            if x1 > x0 and y1 > y0:
+                slices.append((slice(y0, y1), slice(x0, x1)))
+        return slices
+
+    # Calcula o fluxo entre o frame anterior e `frame` (imagem BGR, escala de cinza ou `FrameContext`).
+    # `rois` restringe o cálculo a uma lista de caixas (x, y, w, h) em coordenadas do frame original.
+    # Retorna o fluxo HxWx2 (float32) ou None no primeiro frame, que serve apenas de referência.
+    def update(self, frame, rois=None):
+        if isinstance(frame, FrameContext):
+            context = frame
+        else:
+            context = FrameContext(frame) if frame.ndim == 3 else FrameContext.from_gray(frame)
+        gray = context.gray_at(self.scale)
+
+        prev, self._prev = self._prev, gray
+        if prev is None or prev.shape != gray.shape:
+            self._flow = None
+            return None
+        initial = self._flow if self.reuse_flow else None
+
+        start = time.perf_counter()
+        if rois is None:
+            flow = self._farneback(prev, gray, initial)
+        else:
+            flow = np.zeros(gray.shape + (2,), dtype=np.float32)
+            for rows, cols in self._roi_slices(rois, gray.shape):
+                flow[rows, cols] = self._farneback(prev[rows, cols], gray[rows, cols],
+                                                   None if initial is None else initial[rows, cols])
+        self.last_ms = (time.perf_counter() - start) * 1000
+        self._flow = flow
+
+        if not self.upsample or flow.shape[:2] == context.shape[:2]:
+            return flow
+        return upsample_flow(flow, context.shape)
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Ampliar um campo de fluxo
+
+# Redimensiona o fluxo HxWx2 para `shape` (altura, largura) e multiplica cada componente pela razão entre os tamanhos,
+# já que um deslocamento de 1 pixel na imagem reduzida vale 1/scale pixels na original
+def upsample_flow(flow, shape):
+    height, width = shape[:2]
+    factors = np.array([width / flow.shape[1], height / flow.shape[0]], dtype=np.float32)
+    resized = cv2.resize(flow, (width, height), interpolation=cv2.INTER_LINEAR)
+    resized *= factors
+    return resized
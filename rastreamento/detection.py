@@ -0,0 +1,182 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Detecção com classificadores em cascata
+
+# Funções auxiliares para o `cv2.CascadeClassifier.detectMultiScale()`, a chamada mais cara do pipeline de detecção e
+# rastreamento. As detecções são devolvidas como arrays NumPy Nx4 no formato (x, y, w, h), em coordenadas do frame.
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from rastreamento.boxes import nms
+from rastreamento.frame_context import FrameContext
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Ampliar uma caixa
+
+# Retorna a janela (x0, y0, x1, y1) com o mesmo centro de `bbox` e `factor` vezes o seu tamanho, limitada ao frame
+# de tamanho `shape` (altura, largura)
+def expand_bbox(bbox, factor, shape):
+    x, y, w, h = bbox
+    cx, cy = x + w / 2, y + h / 2
+    half_w, half_h = w * factor / 2, h * factor / 2
+    height, width = shape[:2]
+    x0, y0 = max(0, int(cx - half_w)), max(0, int(cy - half_h))
+    x1, y1 = min(width, int(np.ceil(cx + half_w))), min(height, int(np.ceil(cy + half_h)))
+    return x0, y0, x1, y1
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Detectar em uma escala reduzida
+
+# Roda o `detectMultiScale` na versão em escala de cinza do frame reduzida por `scale` (obtida do `FrameContext`,
+# então a redução é feita uma única vez por frame e compartilhada com as demais etapas) e converte as detecções
+# para as coordenadas do frame original. `image` pode ser um `FrameContext` ou uma imagem em escala de cinza.
+# Como o detector percorre uma pirâmide interna a partir da imagem recebida, reduzir a entrada corta o custo de
+# todos os níveis; objetos menores que a janela do classificador vezes 1/`scale` deixam de ser encontrados.
+# Com `with_scores=True` usa o `detectMultiScale2` e retorna (detecções, pontuações), sendo a pontuação a quantidade
+# de vizinhos de cada detecção, pronta para o pós-processamento (`rastreamento/postprocess.py`).
+def detect_scaled(cascade, image, scale=1.0, with_scores=False, **kwargs):
+    context = image if isinstance(image, FrameContext) else FrameContext.from_gray(image)
+    gray = context.gray_at(scale)
+    if with_scores:
+        detections, scores = cascade.detectMultiScale2(gray, **kwargs)
+        scores = np.asarray(scores, dtype=np.float64).reshape(-1)
+    else:
+        detections = cascade.detectMultiScale(gray, **kwargs)
+    detections = np.asarray(detections, dtype=np.float64).reshape(-1, 4)
+    if scale < 1 and len(detections):
+        height, width = context.gray.shape
+        factors = np.array([width / gray.shape[1], height / gray.shape[0]] * 2)
+        detections = np.round(detections * factors)
+    detections = detections.astype(np.int32)
+    return (detections, scores) if with_scores else detections
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Detectar ao redor da última posição conhecida
+
+# Quando o rastreador perde o objeto, ele normalmente ainda está perto de onde foi visto pela última vez e com
+# tamanho parecido. A função `detect_around()` procura primeiro em uma janela `expand` vezes maior que `last_bbox`,
+# apenas nas escalas entre `scale_range[0]` e `scale_range[1]` vezes o tamanho anterior, e só faz a busca no frame
+# inteiro quando a janela não tem nenhuma detecção (e `fallback` é verdadeiro). Como o custo do `detectMultiScale`
+# cresce com a área da imagem e com a quantidade de escalas, a busca local é muito mais barata em vídeos HD.
+# `gray` pode ser uma imagem em escala de cinza ou um `FrameContext`; a busca no frame inteiro é feita na escala
+# `fallback_scale` (veja `detect_scaled()`).
+# Os demais argumentos (`scaleFactor`, `minNeighbors`, ...) são repassados ao `detectMultiScale`.
+def detect_around(cascade, gray, last_bbox=None, expand=2.0, scale_range=(0.5, 2.0), fallback=True,
+                  fallback_scale=1.0, **kwargs):
+    context = gray if isinstance(gray, FrameContext) else FrameContext.from_gray(gray)
+    gray = context.gray
+
+    if last_bbox is not None and last_bbox[2] > 0 and last_bbox[3] > 0:
+        x0, y0, x1, y1 = expand_bbox(last_bbox, expand, gray.shape)
+        _, _, w, h = last_bbox
+        min_size = (int(w * scale_range[0]), int(h * scale_range[0]))
+        max_size = (min(x1 - x0, int(w * scale_range[1])), min(y1 - y0, int(h * scale_range[1])))
+
+        if max_size[0] > min_size[0] and max_size[1] > min_size[1]:
+            detections = cascade.detectMultiScale(gray[y0:y1, x0:x1], minSize=min_size, maxSize=max_size, **kwargs)
+            if len(detections):
+                return np.asarray(detections, dtype=np.int32).reshape(-1, 4) + np.array([x0, y0, 0, 0], np.int32)
+
+    if not fallback:
+        return np.empty((0, 4), dtype=np.int32)
+    return detect_scaled(cascade, context, fallback_scale, **kwargs)
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Detecção em blocos para imagens de alta resolução
+
+# Um `CascadeClassifier` não pode ser usado por duas threads ao mesmo tempo, então cada thread (ou processo) do pool
+# carrega a sua própria cópia do modelo na primeira vez em que é usada
+_local = threading.local()
+
+
+def _worker_cascade(path):
+    cascades = getattr(_local, 'cascades', None)
+    if cascades is None:
+        cascades = _local.cascades = {}
+    if path not in cascades:
+        cascades[path] = cv2.CascadeClassifier(path)
+    return cascades[path]
+
+
+# Detecta em um bloco e converte as caixas para as coordenadas da imagem inteira
+def _detect_tile(path, tile, offset, scale, kwargs):
+    detections = _worker_cascade(path).detectMultiScale(tile, **kwargs)
+    detections = np.asarray(detections, dtype=np.float64).reshape(-1, 4) / scale
+    return np.round(detections + np.array([offset[0], offset[1], 0, 0])).astype(np.int32)
+
+
+# O custo do `detectMultiScale` cresce com a área da imagem. A classe `TiledDetector` divide imagens grandes em blocos
+# de `tile_size` pixels que se sobrepõem em `overlap` pixels e os processa em paralelo em um pool de threads (ou de
+# processos, com `processes=True`). Cada bloco procura objetos de até `overlap` pixels, que sempre cabem inteiros em
+# algum bloco; objetos maiores são procurados em uma passada extra sobre a imagem reduzida, na escala em que um objeto
+# de `overlap` pixels fica com `coarse_min_size` pixels (o suficiente para a janela dos modelos Haar).
+# As detecções repetidas nas bordas dos blocos são unidas pela supressão de não-máximos (`nms`).
+# Os demais argumentos (`scaleFactor`, `minNeighbors`, ...) são repassados ao `detectMultiScale`.
+class TiledDetector:
+
+    def __init__(self, cascade_path, tile_size=640, overlap=160, max_workers=None, processes=False,
+                 iou_threshold=0.3, coarse_min_size=48, **kwargs):
+        if overlap >= tile_size:
+            raise ValueError('overlap deve ser menor que tile_size')
+        if cv2.CascadeClassifier(cascade_path).empty():
+            raise IOError('Não foi possível carregar o classificador em cascata: {}'.format(cascade_path))
+
+        self.cascade_path = cascade_path
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.iou_threshold = iou_threshold
+        self.coarse_min_size = coarse_min_size
+        self.kwargs = kwargs
+        pool = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        self._executor = pool(max_workers=max_workers or os.cpu_count() or 1)
+
+    # Janelas (x0, y0, x1, y1) dos blocos que cobrem uma imagem de tamanho `shape`
+    def tiles(self, shape):
+        height, width = shape[:2]
+        step = self.tile_size - self.overlap
+        xs = list(range(0, max(width - self.overlap, 1), step))
+        ys = list(range(0, max(height - self.overlap, 1), step))
+        return [(x, y, min(x + self.tile_size, width), min(y + self.tile_size, height)) for y in ys for x in xs]
+
+    # Detecta em `image` (escala de cinza ou `FrameContext`) e retorna as detecções Nx4 da imagem inteira
+    def detect(self, image):
+        context = image if isinstance(image, FrameContext) else FrameContext.from_gray(image)
+        gray = context.gray
+        height, width = gray.shape[:2]
+
+        # Imagens que cabem em um bloco são processadas de uma vez
+        if max(height, width) <= self.tile_size:
+            return _detect_tile(self.cascade_path, gray, (0, 0), 1.0, self.kwargs)
+
+        small = dict(self.kwargs, maxSize=(self.overlap, self.overlap))
+        futures = [self._executor.submit(_detect_tile, self.cascade_path, gray[y0:y1, x0:x1], (x0, y0), 1.0, small)
+                   for x0, y0, x1, y1 in self.tiles(gray.shape)]
+
+        # Passada extra na imagem reduzida, apenas para os objetos maiores que a sobreposição
+        scale = min(1.0, self.coarse_min_size / self.overlap)
+        min_side = max(1, int(self.overlap * scale))
+        large = dict(self.kwargs, minSize=(min_side, min_side))
+        futures.append(self._executor.submit(_detect_tile, self.cascade_path, context.gray_at(scale),
+                                             (0, 0), scale, large))
+
+        detections = np.concatenate([f.result() for f in futures])
+        return detections[nms(detections, iou_threshold=self.iou_threshold)]
+
+    # Encerra o pool
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,80 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Motor de rastreamento sem interface gráfica
+
+# Este módulo separa o laço de rastreamento de `0_Single_Tracking/single_tracking.py` das chamadas de interface
+# (`cv2.selectROI`, `cv2.imshow` e `cv2.waitKey`). A caixa delimitadora inicial é recebida como parâmetro e o resultado
+# é um fluxo de tuplas (frame_idx, ok, bbox), um por frame, produzido na velocidade do `tracker.update()`.
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+import cv2
+
+from rastreamento.prefetch import FramePrefetcher
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Ler os frames de um objeto de captura
+
+# A função `iter_frames()` percorre qualquer objeto com o método `read()` no formato do `cv2.VideoCapture`
+# e para no primeiro frame que não puder ser lido.
+def iter_frames(video):
+    while True:
+        ok, frame = video.read()
+        if not ok:
+            break
+        yield frame
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Rastrear um objeto em uma sequência de frames
+
+# A função `track()` inicializa o rastreador no primeiro frame com a caixa `bbox` e atualiza o rastreador
+# nos frames seguintes. Para cada frame é gerada a tupla (frame_idx, ok, bbox); no frame 0 a caixa é a inicial
+# e `ok` indica se a inicialização foi aceita (o OpenCV 4.5+ retorna `None` em `init()`, tratado como sucesso).
+# Com `writer` (por exemplo um `AsyncVideoWriter`), cada frame é gravado com a caixa desenhada quando `ok`.
+def track(frames, tracker, bbox, writer=None):
+    frames = iter(frames)
+    frame = next(frames, None)
+    if frame is None:
+        return
+
+    bbox = tuple(int(v) for v in bbox)
+    ok = tracker.init(frame, bbox)
+    ok = ok is None or bool(ok)
+    _annotate(writer, frame, ok, bbox)
+    yield 0, ok, bbox
+
+    for frame_idx, frame in enumerate(frames, start=1):
+        ok, bbox = tracker.update(frame)
+        bbox = tuple(int(v) for v in bbox)
+        _annotate(writer, frame, bool(ok), bbox)
+        yield frame_idx, bool(ok), bbox
+
+
+# Desenha a caixa no frame e o envia para `writer`
+def _annotate(writer, frame, ok, bbox):
+    if writer is None:
+        return
+    if ok:
+        x, y, w, h = bbox
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (50, 170, 50), 2, 1)
+    writer.write(frame)
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Rastrear um objeto em um arquivo de vídeo
+
+# A função `track_video()` abre o vídeo em `path`, rastreia o objeto com `track()` e libera a captura ao final,
+# inclusive quando o consumidor interrompe a iteração antes do fim do vídeo.
+# Com `prefetch` maior que zero, os frames são decodificados à frente em uma thread separada (`FramePrefetcher`).
+# `writer` é repassado para `track()`.
+def track_video(path, tracker, bbox, prefetch=8, writer=None):
+    video = cv2.VideoCapture(path)
+    if not video.isOpened():
+        raise IOError('Não foi possível carregar o vídeo: {}'.format(path))
+    if prefetch > 0:
+        video = FramePrefetcher(video, depth=prefetch)
+
+    try:
+        yield from track(iter_frames(video), tracker, bbox, writer)
+    finally:
+        video.release()
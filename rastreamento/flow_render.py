@@ -0,0 +1,72 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Visualização do optical flow denso sem alocações
+
+# O fluxo denso é desenhado no espaço HSV: a direção do movimento vira a matiz e a intensidade vira o brilho. A versão
+# original criava novos arrays de magnitude, ângulo, normalização e imagem final a cada frame, normalizava o brilho
+# pelo máximo de cada frame (as cores mudavam de um frame para o outro) e gravava `angle * (180 / (np.pi / 2))` em um
+# canal uint8, o que estoura para ângulos acima de pi/2.
+#
+# A classe `FlowRenderer` aloca os buffers uma única vez por tamanho de frame e usa apenas funções do OpenCV com o
+# argumento `dst=`. A direção é quantizada em 256 níveis e convertida em matiz (0-179 no OpenCV) por uma tabela
+# (`cv2.LUT`), e a intensidade é escalada por um máximo fixo ou por um máximo acumulado que decai lentamente.
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+import cv2
+import numpy as np
+
+# Tabela de direção (256 níveis cobrindo 0-360 graus) para matiz do OpenCV (0-179)
+HUE_LUT = (np.arange(256) * (180 / 256)).astype(np.uint8)
+
+
+class FlowRenderer:
+
+    # Com `max_magnitude` (pixels), o brilho máximo corresponde sempre a esse deslocamento. Sem ele, o máximo é o maior
+    # deslocamento já visto, multiplicado por `decay` a cada frame para se adaptar quando o movimento diminui.
+    def __init__(self, max_magnitude=None, decay=0.99):
+        self.max_magnitude = max_magnitude
+        self.decay = decay
+        self._running_max = 0.0
+        self._shape = None
+
+    # Aloca os buffers de um tamanho de frame
+    def _allocate(self, shape):
+        height, width = shape
+        self._shape = shape
+        self._dx = np.empty((height, width), np.float32)
+        self._dy = np.empty((height, width), np.float32)
+        self._magnitude = np.empty((height, width), np.float32)
+        self._angle = np.empty((height, width), np.float32)
+        self._direction = np.empty((height, width), np.uint8)
+        self._hue = np.empty((height, width), np.uint8)
+        self._saturation = np.full((height, width), 255, np.uint8)
+        self._value = np.empty((height, width), np.uint8)
+        self._hsv = np.empty((height, width, 3), np.uint8)
+        self._bgr = np.empty((height, width, 3), np.uint8)
+
+    # Máximo usado para normalizar o brilho neste frame
+    def _normaliser(self):
+        if self.max_magnitude is not None:
+            return self.max_magnitude
+        frame_max = cv2.minMaxLoc(self._magnitude)[1]
+        self._running_max = max(self._running_max * self.decay, frame_max)
+        return self._running_max
+
+    # Converte o fluxo HxWx2 em uma imagem BGR. A imagem devolvida é um buffer interno reaproveitado no próximo
+    # `render()`; use `.copy()` para guardá-la.
+    def render(self, flow):
+        if flow.shape[:2] != self._shape:
+            self._allocate(flow.shape[:2])
+
+        np.copyto(self._dx, flow[..., 0])
+        np.copyto(self._dy, flow[..., 1])
+        cv2.cartToPolar(self._dx, self._dy, magnitude=self._magnitude, angle=self._angle, angleInDegrees=True)
+
+        # Direção em 256 níveis (360 graus satura em 255, o mesmo vermelho de 0 grau) e matiz pela tabela
+        cv2.convertScaleAbs(self._angle, dst=self._direction, alpha=256 / 360)
+        cv2.LUT(self._direction, HUE_LUT, dst=self._hue)
+
+        # Brilho proporcional à magnitude, saturado em 255
+        cv2.convertScaleAbs(self._magnitude, dst=self._value, alpha=255 / max(self._normaliser(), 1e-6))
+
+        cv2.merge([self._hue, self._saturation, self._value], dst=self._hsv)
+        return cv2.cvtColor(self._hsv, cv2.COLOR_HSV2BGR, dst=self._bgr)
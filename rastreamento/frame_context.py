@@ -0,0 +1,121 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Contexto de um frame com conversões e reduções compartilhadas
+
+# Em um pipeline com detector, rastreador e optical flow, cada etapa costumava chamar `cv2.cvtColor()` por conta própria
+# e trabalhar sempre na resolução original. A classe `FrameContext` guarda um frame e calcula sob demanda, uma única vez,
+# a versão em escala de cinza, a versão equalizada, o HSV e as versões reduzidas (pirâmide gerada com `cv2.pyrDown`).
+# As etapas recebem o mesmo contexto e cada uma escolhe a resolução de que precisa.
+#
+# A classe `ScaledTracker` permite que qualquer rastreador do OpenCV trabalhe em uma escala reduzida do frame,
+# convertendo as caixas de e para as coordenadas originais.
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+import math
+
+import cv2
+
+
+class FrameContext:
+
+    def __init__(self, frame):
+        self.frame = frame
+        self._gray = None
+        self._equalized = None
+        self._hsv = None
+        self._scaled = {'bgr': {}, 'gray': {}}
+
+    # Cria um contexto a partir de uma imagem já em escala de cinza (sem as versões coloridas)
+    @classmethod
+    def from_gray(cls, gray):
+        context = cls(None)
+        context._gray = gray
+        return context
+
+    @property
+    def shape(self):
+        return self.gray.shape if self.frame is None else self.frame.shape
+
+    # Frame em escala de cinza
+    @property
+    def gray(self):
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    # Escala de cinza com histograma equalizado (pré-processamento usual dos classificadores em cascata)
+    @property
+    def equalized(self):
+        if self._equalized is None:
+            self._equalized = cv2.equalizeHist(self.gray)
+        return self._equalized
+
+    # Frame no espaço de cores HSV
+    @property
+    def hsv(self):
+        if self._hsv is None:
+            self._hsv = cv2.cvtColor(self.frame, cv2.COLOR_BGR2HSV)
+        return self._hsv
+
+    # Retorna `image` reduzida por `scale` (0 < scale <= 1), guardando o resultado em `cache`. As escalas 1/2, 1/4, ...
+    # são os níveis da pirâmide; as demais são obtidas por `cv2.resize` a partir do nível imediatamente maior,
+    # que é bem menor que o frame original.
+    @staticmethod
+    def _reduce(cache, image, scale):
+        if scale >= 1:
+            return image
+        if scale in cache:
+            return cache[scale]
+
+        level = int(math.floor(math.log2(1 / scale) + 1e-9))
+        for k in range(1, level + 1):
+            if 0.5 ** k not in cache:
+                cache[0.5 ** k] = cv2.pyrDown(image)
+            image = cache[0.5 ** k]
+
+        if scale not in cache:
+            height, width = image.shape[:2]
+            factor = scale / 0.5 ** level
+            size = (max(1, int(round(width * factor))), max(1, int(round(height * factor))))
+            cache[scale] = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        return cache[scale]
+
+    # Frame BGR reduzido por `scale`
+    def bgr_at(self, scale):
+        return self._reduce(self._scaled['bgr'], self.frame, scale)
+
+    # Frame em escala de cinza reduzido por `scale`
+    def gray_at(self, scale):
+        return self._reduce(self._scaled['gray'], self.gray, scale)
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Converter caixas entre escalas
+
+# Multiplica as coordenadas da caixa (x, y, w, h) por `factor`
+def scale_bbox(bbox, factor):
+    return tuple(v * factor for v in bbox)
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Rastreador em escala reduzida
+
+# Envolve um rastreador do OpenCV para que ele trabalhe no frame reduzido por `scale`. Os métodos `init()` e `update()`
+# aceitam tanto um frame BGR quanto um `FrameContext`; com o contexto, a redução é compartilhada com as demais etapas.
+# As caixas de entrada e saída estão sempre nas coordenadas do frame original.
+class ScaledTracker:
+
+    def __init__(self, tracker, scale=0.5):
+        self.tracker = tracker
+        self.scale = scale
+
+    def _image(self, frame):
+        context = frame if isinstance(frame, FrameContext) else FrameContext(frame)
+        return context.bgr_at(self.scale)
+
+    def init(self, frame, bbox):
+        bbox = tuple(int(round(v)) for v in scale_bbox(bbox, self.scale))
+        return self.tracker.init(self._image(frame), bbox)
+
+    def update(self, frame):
+        ok, bbox = self.tracker.update(self._image(frame))
+        return ok, scale_bbox(bbox, 1 / self.scale)
@@ -0,0 +1,296 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Carregamento compartilhado do modelo do GOTURN
+
+# O `cv2.TrackerGOTURN_create()` lê e interpreta o `goturn.caffemodel` (centenas de MB) a cada rastreador criado, e a
+# primeira inferência de cada rede ainda paga a alocação das camadas. Com vários alvos, ou quando um rastreador é
+# recriado após uma perda, isso se traduz em segundos de espera na inicialização e em um pico de latência no primeiro
+# frame rastreado.
+#
+# A classe `GoturnModel` carrega a rede uma única vez por processo (a partir de caminhos configuráveis, com cache por
+# caminho em `load_goturn()`) e faz uma inferência de aquecimento logo após o carregamento. Os rastreadores criados por
+# `create_goturn()` usam o construtor `cv2.TrackerGOTURN_create(rede)` do OpenCV 4.9+, que recebe a rede já
+# carregada, então criar um novo rastreador passa a ser praticamente gratuito. Nas versões sem esse construtor, cada
+# rastreador volta a carregar o modelo a partir de `TrackerGOTURN_Params`.
+#
+# Uma rede do módulo `dnn` não pode executar duas inferências ao mesmo tempo. Por isso os rastreadores que compartilham
+# a rede (`GoturnTracker`) usam o lock do modelo em `init()` e `update()`: podem ser usados pelo
+# `ParallelMultiTracker`, mas as inferências são executadas uma de cada vez (cada uma já usa várias threads no dnn).
+#
+# O rastreador interno do OpenCV não permite escolher o backend, o dispositivo nem a quantidade de threads da rede, e
+# faz uma inferência por alvo. `DnnGoturnTracker` e `MultiGoturnTracker` executam a mesma rede diretamente pelo
+# `cv2.dnn`, com o mesmo pré-processamento e a mesma conversão da saída em caixa do `tracker_goturn.cpp`, então os
+# resultados são os do `cv2.TrackerGOTURN`. O `MultiGoturnTracker` junta os pares (alvo, região de busca) de todos os
+# alvos em um único lote, e rastrear vários objetos custa uma única inferência por frame. Além disso, o recorte de cada
+# alvo é preparado ao final do `update()`, e o frame anterior não precisa ser guardado nem recortado de novo.
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+import os
+import threading
+import time
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+from rastreamento.multitracker import TrackGroup
+
+# Arquivos do modelo procurados por padrão no diretório de trabalho, como no script original
+GOTURN_PROTOTXT = 'goturn.prototxt'
+GOTURN_CAFFEMODEL = 'goturn.caffemodel'
+
+# Tamanho das entradas da rede ("data1": alvo no frame anterior, "data2": região de busca no frame atual)
+INPUT_SIZE = 227
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Parâmetros do rastreador do OpenCV
+
+# Retorna os `TrackerGOTURN_Params` com os caminhos do modelo. Gera `IOError` quando algum arquivo não existe.
+def goturn_params(prototxt=GOTURN_PROTOTXT, caffemodel=GOTURN_CAFFEMODEL):
+    for path in (prototxt, caffemodel):
+        if not os.path.isfile(path):
+            raise IOError('Arquivo do modelo do GOTURN não encontrado: {}'.format(path))
+    params = cv2.TrackerGOTURN_Params()
+    params.modelTxt = prototxt
+    params.modelBin = caffemodel
+    return params
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Modelo carregado
+
+class GoturnModel:
+
+    # Carrega a rede dos arquivos `prototxt` e `caffemodel` e, com `warm_up=True`, executa uma inferência de
+    # aquecimento. Os tempos de carregamento e de aquecimento (ms) ficam em `load_ms` e `warm_up_ms`.
+    def __init__(self, prototxt=GOTURN_PROTOTXT, caffemodel=GOTURN_CAFFEMODEL, warm_up=True):
+        self.params = goturn_params(prototxt, caffemodel)
+        self.prototxt = prototxt
+        self.caffemodel = caffemodel
+        self.lock = threading.Lock()
+
+        start = time.perf_counter()
+        self.net = cv2.dnn.readNetFromCaffe(prototxt, caffemodel)
+        self.load_ms = (time.perf_counter() - start) * 1000
+        if self.net.empty():
+            raise IOError('Não foi possível carregar o modelo do GOTURN: {}'.format(caffemodel))
+
+        self.warm_up_ms = None
+        if warm_up:
+            self.warm_up()
+
+    # Executa uma inferência com entradas neutras (cinza médio), para que a alocação das camadas não aconteça no
+    # primeiro frame rastreado
+    def warm_up(self):
+        blob = np.zeros((1, 3, INPUT_SIZE, INPUT_SIZE), dtype=np.float32)
+        start = time.perf_counter()
+        with self.lock:
+            self.net.setInput(blob, 'data1')
+            self.net.setInput(blob, 'data2')
+            self.net.forward('scale')
+        self.warm_up_ms = (time.perf_counter() - start) * 1000
+        return self.warm_up_ms
+
+    # Escolhe o backend (`cv2.dnn.DNN_BACKEND_*`) e o dispositivo (`cv2.dnn.DNN_TARGET_*`) da rede. Como a rede é
+    # recompilada na próxima inferência, o aquecimento é repetido.
+    def configure(self, backend=None, target=None):
+        with self.lock:
+            if backend is not None:
+                self.net.setPreferableBackend(backend)
+            if target is not None:
+                self.net.setPreferableTarget(target)
+        return self.warm_up()
+
+    def __repr__(self):
+        return 'GoturnModel({!r}, {!r})'.format(self.prototxt, self.caffemodel)
+
+
+# Retorna o modelo dos arquivos informados, carregado na primeira chamada e reutilizado nas seguintes.
+# O cache é feito pelo caminho absoluto, então caminhos relativos diferentes para o mesmo arquivo compartilham a rede.
+def load_goturn(prototxt=GOTURN_PROTOTXT, caffemodel=GOTURN_CAFFEMODEL):
+    return _load_goturn(os.path.abspath(prototxt), os.path.abspath(caffemodel))
+
+
+@lru_cache(maxsize=None)
+def _load_goturn(prototxt, caffemodel):
+    return GoturnModel(prototxt, caffemodel)
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Rastreador com a rede compartilhada
+
+class GoturnTracker:
+
+    # `tracker` é o `cv2.TrackerGOTURN` criado a partir da rede de `model`
+    def __init__(self, tracker, model):
+        self.tracker = tracker
+        self.model = model
+
+    def init(self, image, bbox):
+        with self.model.lock:
+            return self.tracker.init(image, bbox)
+
+    def update(self, image):
+        with self.model.lock:
+            return self.tracker.update(image)
+
+
+# Cria um rastreador GOTURN usando o modelo `model` (por padrão, o carregado por `load_goturn()` com os arquivos do
+# diretório de trabalho). Nas versões do OpenCV sem o construtor que recebe a rede, o rastreador carrega o modelo
+# novamente a partir dos arquivos.
+def create_goturn(model=None):
+    model = load_goturn() if model is None else model
+    try:
+        tracker = cv2.TrackerGOTURN_create(model.net)
+    except cv2.error:
+        return cv2.TrackerGOTURN_create(model.params)
+    return GoturnTracker(tracker, model)
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# GOTURN pelo módulo dnn
+
+# Fator entre a região recortada ao redor do alvo e a caixa do alvo, e média subtraída das entradas da rede
+PADDING = 2.0
+MEAN = (128, 128, 128)
+
+
+# Região (x, y, w, h) recortada ao redor de `bbox` no frame de tamanho `shape`, como em `tracker_goturn.cpp`: o dobro
+# da caixa, com o mesmo centro, limitada ao tamanho do frame. Assim como no OpenCV, (x, y) está nas coordenadas do
+# frame com uma borda de (w, h) pixels em cada lado.
+def search_region(bbox, shape):
+    x, y, w, h = bbox
+    rows, cols = shape[:2]
+    cx, cy = x + w / 2, y + h / 2
+    rx, ry = cx - w * PADDING / 2 + w * PADDING, cy - h * PADDING / 2 + h * PADDING
+    rw, rh = min(w * PADDING, cols), min(h * PADDING, rows)
+    rx, ry = max(-cols * 0.5, min(rx, cols * 1.5)), max(-rows * 0.5, min(ry, rows * 1.5))
+    return rx, ry, rw, rh
+
+
+# Recorta `region` de `frame`, repetindo as bordas do frame nas partes de fora (como o `copyMakeBorder` com
+# `BORDER_REPLICATE` do OpenCV, mas sem copiar o frame inteiro), e redimensiona para `INPUT_SIZE`. A média é
+# subtraída depois, na montagem do lote. Retorna `None` quando a região é vazia.
+def crop_patch(frame, region):
+    rx, ry, rw, rh = region
+    x0, y0 = int(np.rint(rx)) - int(rw), int(np.rint(ry)) - int(rh)
+    w, h = int(np.rint(rw)), int(np.rint(rh))
+    if w <= 0 or h <= 0:
+        return None
+
+    rows, cols = frame.shape[:2]
+    cx0, cy0 = min(max(x0, 0), cols - 1), min(max(y0, 0), rows - 1)
+    cx1, cy1 = min(max(x0 + w, cx0 + 1), cols), min(max(y0 + h, cy0 + 1), rows)
+    left, top = min(max(cx0 - x0, 0), w - (cx1 - cx0)), min(max(cy0 - y0, 0), h - (cy1 - cy0))
+    right, bottom = w - (cx1 - cx0) - left, h - (cy1 - cy0) - top
+    patch = frame[cy0:cy1, cx0:cx1]
+    if left or top or right or bottom:
+        patch = cv2.copyMakeBorder(patch, top, bottom, left, right, cv2.BORDER_REPLICATE)
+
+    return cv2.resize(patch, (INPUT_SIZE, INPUT_SIZE), interpolation=cv2.INTER_LINEAR_EXACT)
+
+
+# Converte a saída da rede (x1, y1, x2, y2 em pixels da entrada de `INPUT_SIZE`) em uma caixa (x, y, w, h) do frame
+def output_box(output, region):
+    rx, ry, rw, rh = region
+    x1, y1, x2, y2 = (float(v) for v in output)
+    return (int(np.rint(rx + x1 * rw / INPUT_SIZE - rw)), int(np.rint(ry + y1 * rh / INPUT_SIZE - rh)),
+            int(np.rint((x2 - x1) * rw / INPUT_SIZE)), int(np.rint((y2 - y1) * rh / INPUT_SIZE)))
+
+
+# Interseção da caixa com o frame de tamanho `shape`
+def clip_box(bbox, shape):
+    x, y, w, h = bbox
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, shape[1]), min(y + h, shape[0])
+    return x0, y0, max(x1 - x0, 0), max(y1 - y0, 0)
+
+
+# Carrega o modelo (ou usa `model`), aplica `backend`, `target` e `threads` e retorna o modelo. `threads` é a
+# quantidade de threads do OpenCV (`cv2.setNumThreads`), que vale para o processo inteiro.
+def _configure(model, backend, target, threads):
+    model = load_goturn() if model is None else model
+    if threads is not None:
+        cv2.setNumThreads(threads)
+    if backend is not None or target is not None:
+        model.configure(backend, target)
+    return model
+
+
+# Estado de um alvo: a última caixa prevista (limitada ao frame, como no `tracker_goturn.cpp`) e o recorte do alvo já
+# redimensionado para a rede
+class _GoturnTarget:
+
+    def __init__(self, frame, bbox):
+        self.update(frame, tuple(int(v) for v in bbox))
+
+    def update(self, frame, bbox):
+        self.bbox = bbox
+        self.patch = crop_patch(frame, search_region(bbox, frame.shape))
+
+
+# Executa a rede uma única vez para todos os `targets` no frame `frame`, atualiza o estado de cada um e retorna a
+# lista de (ok, bbox). `ok` é falso quando a caixa prevista fica fora do frame (ou o alvo já estava perdido).
+def _track(model, targets, frame):
+    results = [(False, (0, 0, 0, 0))] * len(targets)
+    batch, regions, searches = [], [], []
+    for idx, target in enumerate(targets):
+        region = search_region(target.bbox, frame.shape)
+        search = crop_patch(frame, region) if target.patch is not None else None
+        if search is not None:
+            batch.append(idx)
+            regions.append(region)
+            searches.append((target.patch, search))
+    if not batch:
+        return results
+
+    with model.lock:
+        model.net.setInput(cv2.dnn.blobFromImages([t for t, _ in searches], mean=MEAN), 'data1')
+        model.net.setInput(cv2.dnn.blobFromImages([s for _, s in searches], mean=MEAN), 'data2')
+        outputs = model.net.forward('scale').reshape(len(batch), 4)
+
+    for idx, region, output in zip(batch, regions, outputs):
+        bbox = clip_box(output_box(output, region), frame.shape)
+        targets[idx].update(frame, bbox)
+        results[idx] = (bbox[2] > 0 and bbox[3] > 0, bbox)
+    return results
+
+
+class DnnGoturnTracker:
+
+    # Rastreador de um alvo com a interface `init()`/`update()` do OpenCV. `model` é um `GoturnModel` (por padrão, o
+    # de `load_goturn()`); `backend`, `target` e `threads` são aplicados à rede (veja `_configure`).
+    def __init__(self, model=None, backend=None, target=None, threads=None):
+        self.model = _configure(model, backend, target, threads)
+        self._target = None
+
+    def init(self, image, bbox):
+        self._target = _GoturnTarget(image, bbox)
+        return self._target.patch is not None
+
+    def update(self, image):
+        return _track(self.model, [self._target], image)[0]
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Vários alvos em um único lote
+
+class MultiGoturnTracker(TrackGroup):
+
+    # `model`, `backend`, `target` e `threads` são os do `DnnGoturnTracker`. Com `max_failures` e/ou `min_confidence`
+    # os alvos perdidos são removidos e ficam em `evicted`, com as mesmas regras do `ParallelMultiTracker`
+    # (ambos herdam do `TrackGroup`).
+    def __init__(self, model=None, backend=None, target=None, threads=None, max_failures=None, min_confidence=None):
+        TrackGroup.__init__(self, max_failures, min_confidence)
+        self.model = _configure(model, backend, target, threads)
+
+    # Adiciona um alvo com a caixa `bbox` do frame e retorna o seu id
+    def add(self, frame, bbox):
+        target = _GoturnTarget(frame, bbox)
+        return self._add_track(target, bbox, target.patch is not None).id
+
+    # Atualiza todos os alvos com uma única inferência e retorna {id: (ok, bbox)}. Os alvos removidos neste frame
+    # ficam em `evicted` e não aparecem no resultado.
+    def update(self, frame):
+        self._record(_track(self.model, [t.tracker for t in self.tracks], frame))
+        return {t.id: (t.ok, t.bbox) for t in self.tracks}
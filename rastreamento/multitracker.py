@@ -0,0 +1,184 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Multitracker paralelo
+
+# O `cv2.legacy.MultiTracker_create()` atualiza cada rastreador um depois do outro em um único núcleo, então o tempo
+# por frame cresce linearmente com a quantidade de objetos. A classe `ParallelMultiTracker` mantém a mesma interface
+# (`add()` e `update()`), mas distribui as atualizações entre as threads de um `ThreadPoolExecutor`. O OpenCV libera
+# o GIL dentro de `tracker.update()`, então as atualizações realmente rodam em paralelo nos vários núcleos.
+#
+# As caixas são devolvidas sempre na ordem em que os objetos foram adicionados, e o resultado individual de cada
+# rastreador fica disponível em `oks` após cada `update()`.
+#
+# Cada objeto é guardado em um `Track`, que acompanha a saúde do rastreamento: idade, acertos, falhas consecutivas e
+# uma confiança (média móvel exponencial dos acertos). Com `max_failures` e/ou `min_confidence` definidos, os objetos
+# perdidos são removidos do grupo e deixam de consumir processamento; os removidos no último `update()` ficam em
+# `evicted`. Essa contabilidade (ids, `Track` e regras de remoção) fica na classe base `TrackGroup`, compartilhada
+# com o `MultiGoturnTracker` (rastreamento/goturn.py).
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+import numpy as np
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Estado de um objeto rastreado
+
+# `id` é único dentro do multitracker e não muda quando outros objetos são removidos.
+# `age` conta os frames processados desde a adição, `hits` os frames com sucesso e `failures` as falhas seguidas.
+class Track:
+
+    # Peso de cada frame novo na média móvel da confiança
+    CONFIDENCE_ALPHA = 0.2
+
+    def __init__(self, track_id, tracker, bbox, ok):
+        self.id = track_id
+        self.tracker = tracker
+        self.bbox = bbox
+        self.ok = ok
+        self.age = 0
+        self.hits = 0
+        self.failures = 0 if ok else 1
+        self.confidence = 1.0 if ok else 0.0
+
+    # Registra o resultado de um `update()`; em caso de falha mantém a última caixa conhecida
+    def record(self, ok, bbox):
+        self.age += 1
+        self.ok = ok
+        if ok:
+            self.bbox = bbox
+            self.hits += 1
+            self.failures = 0
+        else:
+            self.failures += 1
+        self.confidence += self.CONFIDENCE_ALPHA * (float(ok) - self.confidence)
+
+    def __repr__(self):
+        return 'Track(id={}, ok={}, age={}, failures={}, confidence={:.2f})'.format(
+            self.id, self.ok, self.age, self.failures, self.confidence)
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Grupo de objetos rastreados
+
+# Base dos multitrackers: guarda os `Track` na ordem de adição, gera os ids e aplica as regras de remoção.
+# `max_failures` remove o objeto após essa quantidade de falhas consecutivas e `min_confidence` remove o objeto
+# quando a confiança fica abaixo do valor; com os dois em `None` nenhum objeto é removido.
+class TrackGroup:
+
+    def __init__(self, max_failures=None, min_confidence=None):
+        self.max_failures = max_failures
+        self.min_confidence = min_confidence
+        self.tracks = []
+        self.evicted = []
+        self._ids = count()
+
+    def __len__(self):
+        return len(self.tracks)
+
+    @property
+    def ids(self):
+        return [t.id for t in self.tracks]
+
+    # Cria o `Track` de um objeto novo com o próximo id e o adiciona ao final de `tracks`
+    def _add_track(self, tracker, bbox, ok):
+        track = Track(next(self._ids), tracker, tuple(float(v) for v in bbox), ok)
+        self.tracks.append(track)
+        return track
+
+    # Remove os objetos com os ids em `track_ids` e retorna os `Track` removidos
+    def remove(self, track_ids):
+        track_ids = set(track_ids)
+        removed = [t for t in self.tracks if t.id in track_ids]
+        if removed:
+            self.tracks = [t for t in self.tracks if t.id not in track_ids]
+        return removed
+
+    # Verifica se um objeto deve ser removido
+    def _is_dead(self, track):
+        if self.max_failures is not None and track.failures >= self.max_failures:
+            return True
+        return self.min_confidence is not None and track.confidence < self.min_confidence
+
+    # Registra os resultados (ok, bbox) de um frame, na ordem de `tracks`, e remove os objetos perdidos, que ficam
+    # em `evicted`
+    def _record(self, results):
+        for track, (ok, bbox) in zip(self.tracks, results):
+            track.record(bool(ok), tuple(float(v) for v in bbox))
+
+        self.evicted = [t for t in self.tracks if self._is_dead(t)]
+        if self.evicted:
+            self.tracks = [t for t in self.tracks if not self._is_dead(t)]
+
+
+class ParallelMultiTracker(TrackGroup):
+
+    # `max_workers` é a quantidade de threads do pool (padrão: número de núcleos da máquina).
+    # `max_failures` e `min_confidence` são as regras de remoção do `TrackGroup`.
+    def __init__(self, max_workers=None, max_failures=None, min_confidence=None):
+        TrackGroup.__init__(self, max_failures, min_confidence)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = None
+
+    @property
+    def trackers(self):
+        return [t.tracker for t in self.tracks]
+
+    @property
+    def oks(self):
+        return [t.ok for t in self.tracks]
+
+    # Inicializa `tracker` no frame `image` com a caixa `bbox` e o adiciona ao grupo.
+    # Assim como no `cv2.legacy.MultiTracker`, retorna se a inicialização foi aceita; o objeto é adicionado
+    # mesmo em caso de falha, para que os índices continuem alinhados com a ordem de adição.
+    # O `Track` criado é o último item de `tracks`.
+    def add(self, tracker, image, bbox):
+        bbox = tuple(float(v) for v in bbox)
+        ok = tracker.init(image, tuple(int(v) for v in bbox))
+        # O OpenCV 4.5+ retorna `None` em `init()` nos rastreadores da API nova
+        ok = ok is None or bool(ok)
+        self._add_track(tracker, bbox, ok)
+        return ok
+
+    # Atualiza um único rastreador
+    @staticmethod
+    def _update_one(tracker, image):
+        ok, bbox = tracker.update(image)
+        return bool(ok), tuple(float(v) for v in bbox)
+
+    # Atualiza todos os rastreadores com o frame `image`.
+    # Retorna (ok, boxes) como o `cv2.legacy.MultiTracker`: `ok` é verdadeiro quando todos os objetos foram
+    # encontrados e `boxes` é um array Nx4 na ordem de adição. O resultado de cada objeto fica em `oks`.
+    # Os objetos removidos neste frame ficam em `evicted` e não aparecem em `boxes`.
+    def update(self, image):
+        trackers = self.trackers
+        if len(trackers) == 1 or self.max_workers == 1:
+            results = [self._update_one(t, image) for t in trackers]
+        elif trackers:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='ParallelMultiTracker')
+            results = list(self._executor.map(self._update_one, trackers, [image] * len(trackers)))
+        else:
+            results = []
+
+        self._record(results)
+        return all(self.oks), self.getObjects()
+
+    # Caixas atuais de todos os objetos, no mesmo formato do `cv2.legacy.MultiTracker.getObjects()`
+    def getObjects(self):
+        return np.array([t.bbox for t in self.tracks], dtype=np.float64).reshape(-1, 4)
+
+    # Encerra as threads do pool
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
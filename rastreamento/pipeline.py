@@ -0,0 +1,95 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Detecção e rastreamento de múltiplos objetos
+
+# A classe `MultiObjectPipeline` combina um detector, o `ParallelMultiTracker` e a associação pelo algoritmo húngaro
+# (`rastreamento/association.py`). A cada `detect_every` frames o detector roda uma única vez no frame inteiro e
+# todas as detecções são associadas aos objetos já rastreados:
+#  - detecção associada: o objeto continua sendo rastreado (opcionalmente com o rastreador reiniciado na caixa detectada)
+#  - detecção sem par: um novo rastreador é criado para ela
+#  - objeto sem par em `max_misses` detecções seguidas: o objeto é retirado
+# Nos demais frames apenas os rastreadores são atualizados, em paralelo. Assim uma passada do detector atende todos
+# os alvos, em vez de uma chamada do detector para cada objeto perdido.
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+from rastreamento.association import associate
+from rastreamento.multitracker import ParallelMultiTracker
+
+
+class MultiObjectPipeline:
+
+    # `detect(frame)` retorna as detecções do frame (N x 4, formato (x, y, w, h)) e `create_tracker()` um rastreador
+    # novo. Com `refresh=True` o rastreador de um objeto associado é reiniciado na caixa detectada, o que corrige o
+    # desvio acumulado ao custo de um `init()` por objeto a cada detecção. `max_failures` é repassado ao
+    # `ParallelMultiTracker` para remover objetos cujo rastreador falha seguidamente entre as detecções.
+    def __init__(self, detect, create_tracker, detect_every=10, iou_threshold=0.3, max_misses=2,
+                 max_failures=None, refresh=False, max_workers=None):
+        self.detect = detect
+        self.create_tracker = create_tracker
+        self.detect_every = detect_every
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.refresh = refresh
+        self.multi_tracker = ParallelMultiTracker(max_workers=max_workers, max_failures=max_failures)
+        self.misses = {}
+        self.retired = []
+        self.frame_idx = -1
+
+    @property
+    def tracks(self):
+        return self.multi_tracker.tracks
+
+    # Associa as detecções do frame aos objetos rastreados
+    def _associate(self, frame, boxes):
+        detections = self.detect(frame)
+        tracks = list(self.multi_tracker.tracks)
+        matches, unmatched_tracks, unmatched_detections = associate(boxes, detections, self.iou_threshold)
+
+        for track_idx, detection_idx in matches:
+            track = tracks[track_idx]
+            self.misses[track.id] = 0
+            if self.refresh:
+                # O `update()` deste frame já foi registrado no `Track`; a caixa detectada apenas substitui essa
+                # observação, sem contar um frame a mais na idade e nos acertos
+                bbox = tuple(int(v) for v in detections[detection_idx])
+                track.tracker = self.create_tracker()
+                ok = track.tracker.init(frame, bbox)
+                track.ok = ok is None or bool(ok)
+                if track.ok:
+                    track.bbox = tuple(float(v) for v in bbox)
+
+        lost = []
+        for track_idx in unmatched_tracks:
+            track = tracks[track_idx]
+            self.misses[track.id] = self.misses.get(track.id, 0) + 1
+            if self.misses[track.id] >= self.max_misses:
+                lost.append(track.id)
+        self.retired.extend(self.multi_tracker.remove(lost))
+
+        for detection_idx in unmatched_detections:
+            self.multi_tracker.add(self.create_tracker(), frame, detections[detection_idx])
+            self.misses[self.multi_tracker.tracks[-1].id] = 0
+
+    # Processa um frame e retorna a lista de `Track` ativos. Os objetos retirados neste frame, por falta de
+    # detecção ou por falhas do rastreador, ficam em `retired`.
+    def process(self, frame):
+        self.frame_idx += 1
+        self.retired = []
+
+        _, boxes = self.multi_tracker.update(frame)
+        self.retired.extend(self.multi_tracker.evicted)
+
+        if self.frame_idx % self.detect_every == 0:
+            self._associate(frame, boxes)
+
+        for track in self.retired:
+            self.misses.pop(track.id, None)
+        return self.multi_tracker.tracks
+
+    def close(self):
+        self.multi_tracker.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
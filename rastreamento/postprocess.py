@@ -0,0 +1,88 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Pós-processamento de detecções
+
+# A saída do `detectMultiScale` costuma trazer caixas sobrepostas para o mesmo objeto (principalmente com o
+# `fullbody.xml`) e caixas de tamanhos impossíveis para a cena. Este módulo reúne as etapas de limpeza, vetorizadas
+# com NumPy ou executadas pelo OpenCV (dezenas de caixas em dezenas de microssegundos; centenas de caixas levam
+# algumas centenas de microssegundos no NMS e perto de 1 ms na fusão):
+#  - `filter_size`: descarta caixas fora do intervalo de tamanho
+#  - `nms` (rastreamento/boxes.py): supressão de não-máximos por IoU
+#  - `fuse_boxes`: fusão das caixas sobrepostas em uma média ponderada pela pontuação
+# A função `postprocess()` encadeia as etapas e é usada por todos os pontos de detecção do repositório.
+#
+# As caixas estão no formato (x, y, w, h). Para os classificadores em cascata, a pontuação natural é a quantidade de
+# vizinhos de cada detecção, devolvida por `cascade.detectMultiScale2()`.
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+import numpy as np
+
+from rastreamento.boxes import iou_matrix, nms
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Filtrar por tamanho
+
+# Retorna a máscara booleana das caixas com largura e altura dentro de `min_size` e `max_size` (pares (w, h);
+# `None` desativa o limite)
+def filter_size(boxes, min_size=None, max_size=None):
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    keep = np.ones(len(boxes), dtype=bool)
+    if min_size is not None:
+        keep &= (boxes[:, 2] >= min_size[0]) & (boxes[:, 3] >= min_size[1])
+    if max_size is not None:
+        keep &= (boxes[:, 2] <= max_size[0]) & (boxes[:, 3] <= max_size[1])
+    return keep
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Fundir caixas sobrepostas
+
+# Agrupa as caixas com IoU acima de `iou_threshold` em relação à caixa de maior pontuação ainda não agrupada e
+# substitui cada grupo pela média das coordenadas ponderada pelas pontuações. Ao contrário do NMS, que descarta as
+# caixas vizinhas, a fusão aproveita todas elas para uma caixa mais estável. Sem `scores`, todas têm o mesmo peso.
+# Retorna (caixas, pontuações), com a pontuação de cada grupo igual à soma das pontuações dos membros.
+def fuse_boxes(boxes, scores=None, iou_threshold=0.5):
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    scores = np.ones(len(boxes)) if scores is None else np.asarray(scores, dtype=np.float64).reshape(-1)
+    if len(boxes) == 0:
+        return boxes, scores
+
+    # Os líderes dos grupos são exatamente as caixas mantidas pelo NMS. Cada caixa entra no grupo do primeiro líder
+    # (em ordem de pontuação) com que se sobrepõe, então basta a matriz de IoU entre os líderes e as caixas.
+    leaders = nms(boxes, scores, iou_threshold)
+    overlaps = iou_matrix(boxes[leaders], boxes) > iou_threshold
+    overlaps[np.arange(len(leaders)), leaders] = True
+    groups = np.argmax(overlaps, axis=0)
+    corners = np.column_stack([boxes[:, :2], boxes[:, :2] + boxes[:, 2:]])
+
+    # Médias ponderadas de todos os grupos de uma vez
+    weights = np.where(scores > 0, scores, 1e-12)
+    totals = np.bincount(groups, weights=weights)
+    fused = np.column_stack([np.bincount(groups, weights=weights * corners[:, k]) for k in range(4)]) / totals[:, None]
+    fused[:, 2:] -= fused[:, :2]
+    return fused, np.bincount(groups, weights=scores)
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Pós-processamento completo
+
+# Aplica o filtro de tamanho e, em seguida, a fusão (`fuse=True`) ou o NMS nas caixas restantes.
+# Sem `scores`, cada caixa vale 1.
+# Retorna (caixas, pontuações) com as caixas em inteiros, prontas para desenhar ou iniciar rastreadores.
+def postprocess(boxes, scores=None, min_size=None, max_size=None, iou_threshold=0.5, fuse=False):
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    weights = None if scores is None else np.asarray(scores, dtype=np.float64).reshape(-1)
+
+    keep = filter_size(boxes, min_size, max_size)
+    boxes = boxes[keep]
+    weights = None if weights is None else weights[keep]
+
+    if fuse:
+        boxes, scores = fuse_boxes(boxes, weights, iou_threshold)
+    else:
+        # Sem pontuações, o NMS dá prioridade às caixas maiores
+        keep = nms(boxes, weights, iou_threshold)
+        boxes = boxes[keep]
+        scores = np.ones(len(boxes)) if weights is None else weights[keep]
+
+    return np.round(boxes).astype(np.int32), scores
@@ -0,0 +1,113 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Leitura antecipada de frames em uma thread separada
+
+# Nos scripts de rastreamento, `video.read()` e `tracker.update()` são chamados um depois do outro, então o tempo de
+# decodificação soma diretamente na latência de cada frame. A classe `FramePrefetcher` decodifica os próximos frames
+# em uma thread de fundo e os guarda em uma fila limitada, enquanto a thread principal rastreia. Como o OpenCV libera
+# o GIL durante a decodificação, em máquinas com vários núcleos a leitura fica praticamente de graça para o rastreador.
+#
+# A classe tem a mesma interface de leitura do `cv2.VideoCapture` (`read()`, `isOpened()` e `release()`),
+# então pode substituir a captura sem alterar o laço dos scripts:
+#   video = FramePrefetcher(cv2.VideoCapture('videos/race.mp4'), depth=8)
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+import queue
+import threading
+
+import cv2
+
+# Marcador colocado na fila quando a captura termina ou falha
+_END = object()
+
+
+class FramePrefetcher:
+
+    # `video` pode ser um `cv2.VideoCapture` já aberto ou o caminho/índice usado para abri-lo.
+    # `depth` é a quantidade máxima de frames decodificados à frente.
+    # Com `drop=False` (arquivos) a thread de leitura espera quando a fila está cheia e nenhum frame é perdido.
+    # Com `drop=True` (câmeras e streams ao vivo) o frame mais antigo da fila é descartado para dar lugar ao
+    # mais novo, então o rastreador sempre recebe imagens recentes; a quantidade descartada fica em `dropped`.
+    def __init__(self, video, depth=8, drop=False):
+        if depth < 1:
+            raise ValueError('depth deve ser maior ou igual a 1')
+
+        self.video = video if isinstance(video, cv2.VideoCapture) else cv2.VideoCapture(video)
+        self.drop = drop
+        self.dropped = 0
+
+        self._queue = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._finished = False
+        self._thread = threading.Thread(target=self._run, name='FramePrefetcher', daemon=True)
+        self._thread.start()
+
+    # Laço da thread de leitura
+    def _run(self):
+        while not self._stop.is_set():
+            ok, frame = self.video.read()
+            if not ok:
+                break
+            if self.drop:
+                self._put_dropping(frame)
+            else:
+                self._put_blocking(frame)
+        self._put_blocking(_END)
+
+    # Espera espaço na fila, verificando periodicamente se `release()` foi chamado
+    def _put_blocking(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    # Descarta o frame mais antigo quando a fila está cheia
+    def _put_dropping(self, item):
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def isOpened(self):
+        return self.video.isOpened()
+
+    # Propriedade da captura (por exemplo `cv2.CAP_PROP_FPS`), como no `cv2.VideoCapture.get()`
+    def get(self, prop_id):
+        return self.video.get(prop_id)
+
+    # Retorna o próximo frame no formato (ok, frame) do `cv2.VideoCapture.read()`
+    def read(self):
+        if self._finished:
+            return False, None
+
+        item = self._queue.get()
+        if item is _END:
+            self._finished = True
+            return False, None
+        return True, item
+
+    # Encerra a thread de leitura e libera a captura
+    def release(self):
+        self._stop.set()
+        self._finished = True
+        # Esvazia a fila para desbloquear uma thread que esteja esperando espaço
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._thread.join()
+        self.video.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
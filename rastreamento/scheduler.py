@@ -0,0 +1,132 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Agendador de detecção e rastreamento
+
+# Em `6_Detection/Detection + Tracker/Combination.py` o detector só rodava depois de uma falha do rastreador, e então
+# repetia a detecção em todos os frames até encontrar algo. A classe `DetectionScheduler` intercala as duas etapas:
+# o detector roda a cada N frames, ou antes disso quando o rastreador falha ou sua confiança cai, e nos frames
+# intermediários apenas o rastreador (bem mais barato) é atualizado.
+#
+# O intervalo N é ajustado a partir dos custos medidos (média móvel) do detector e do rastreador, de forma que a média
+# do tempo por frame fique dentro de `budget_ms`: em uma janela de N frames há uma detecção e N - 1 atualizações,
+#   (custo_detector + (N - 1) * custo_rastreador) / N <= budget_ms
+# Enquanto nenhum objeto está sendo rastreado, o detector também respeita o intervalo, então o orçamento continua
+# valendo quando os alvos saem e voltam à cena.
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+import math
+import time
+
+from rastreamento.multitracker import Track
+
+
+class DetectionScheduler:
+
+    # `detect(frame, last_bbox)` retorna a caixa (x, y, w, h) do objeto ou `None`; `last_bbox` é a última caixa
+    # conhecida do objeto (ou `None`). Com `last_bbox` definido, `detect` deve retornar apenas uma detecção que
+    # corresponda a essa caixa (e `None` quando nenhuma corresponder), para que a detecção periódica não troque o
+    # objeto rastreado por outro. `create_tracker()` retorna um rastreador novo a cada detecção.
+    # `budget_ms` é o tempo médio por frame desejado; com `interval` definido o intervalo fica fixo.
+    # Na primeira falha do rastreador a detecção é antecipada para o mesmo frame, e enquanto a confiança estiver
+    # abaixo de `min_confidence` o intervalo cai pela metade. Após `max_failures` falhas seguidas o objeto é
+    # considerado perdido e o detector volta a procurá-lo no ritmo do intervalo.
+    def __init__(self, detect, create_tracker, budget_ms=33.0, interval=None, min_interval=1, max_interval=60,
+                 min_confidence=0.5, max_failures=5, smoothing=0.2):
+        self.detect = detect
+        self.create_tracker = create_tracker
+        self.budget_ms = budget_ms
+        self.fixed_interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.min_confidence = min_confidence
+        self.max_failures = max_failures
+        self.smoothing = smoothing
+
+        self.interval = interval or min_interval
+        self.detection_ms = None
+        self.tracking_ms = None
+        self.track = None
+        self.last_bbox = None
+        self.frames_since_detection = 0
+        self._ids = 0
+
+    # Média móvel exponencial do custo medido
+    def _average(self, current, sample):
+        return sample if current is None else current + self.smoothing * (sample - current)
+
+    # Recalcula o intervalo entre detecções a partir dos custos medidos. Antes da primeira atualização do rastreador
+    # o custo dele é considerado zero, para que a busca inicial também respeite o orçamento.
+    def _update_interval(self):
+        if self.fixed_interval is not None or self.detection_ms is None:
+            return
+        tracking_ms = self.tracking_ms or 0.0
+        if tracking_ms >= self.budget_ms:
+            interval = self.max_interval
+        else:
+            interval = math.ceil((self.detection_ms - tracking_ms) / (self.budget_ms - tracking_ms))
+        self.interval = max(self.min_interval, min(self.max_interval, interval))
+
+    def _should_detect(self):
+        if self.detection_ms is None:
+            return True
+        interval = self.interval
+        if self.track is not None and self.track.confidence < self.min_confidence:
+            interval = max(self.min_interval, interval // 2)
+        return self.frames_since_detection >= interval
+
+    # Roda o detector e, se algo for encontrado, inicia um rastreador novo na caixa detectada. Sem detecção
+    # correspondente o rastreador atual é mantido.
+    def _run_detection(self, frame):
+        start = time.perf_counter()
+        bbox = self.detect(frame, self.last_bbox)
+        if bbox is not None:
+            bbox = tuple(int(v) for v in bbox)
+            tracker = self.create_tracker()
+            ok = tracker.init(frame, bbox)
+            self._ids += 1
+            self.track = Track(self._ids, tracker, bbox, ok is None or bool(ok))
+            self.last_bbox = bbox
+        self.detection_ms = self._average(self.detection_ms, (time.perf_counter() - start) * 1000)
+        self.frames_since_detection = 0
+        return bbox is not None
+
+    def _run_tracking(self, frame):
+        start = time.perf_counter()
+        ok, bbox = self.track.tracker.update(frame)
+        self.tracking_ms = self._average(self.tracking_ms, (time.perf_counter() - start) * 1000)
+        self.track.record(bool(ok), tuple(int(v) for v in bbox))
+        if ok:
+            self.last_bbox = self.track.bbox
+        return bool(ok)
+
+    def _result(self, detected):
+        self._update_interval()
+        if self.track is None:
+            return False, None, detected
+        return self.track.ok, self.track.bbox, detected
+
+    # Processa um frame e retorna (ok, bbox, detected): `ok` indica se o objeto foi encontrado neste frame, `bbox` é a
+    # caixa atual (ou `None` quando não há objeto) e `detected` indica se o detector rodou neste frame.
+    def process(self, frame):
+        self.frames_since_detection += 1
+        detected = False
+
+        if self._should_detect():
+            detected = True
+            if self._run_detection(frame):
+                return self._result(detected)
+
+        if self.track is None:
+            return self._result(detected)
+
+        if not self._run_tracking(frame):
+            # Primeira falha: a detecção é antecipada para o mesmo frame
+            if not detected and self.track.failures == 1:
+                detected = True
+                if self._run_detection(frame):
+                    return self._result(detected)
+            if self.track.failures >= self.max_failures:
+                # Objeto perdido: a próxima detecção procura em todo o frame, sem exigir correspondência
+                self.track = None
+                self.last_bbox = None
+
+        return self._result(detected)
@@ -0,0 +1,164 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Rastreador de pontos com optical flow esparso (Lucas-Kanade)
+
+# A versão original procurava os cantos (Shi-Tomasi) apenas no primeiro frame, então a quantidade de pontos só
+# diminuía, e as cores eram indexadas pela posição na lista, que muda quando um ponto se perde. A classe
+# `SparseFlowTracker`:
+#  - dá a cada ponto um id estável, mantido enquanto ele for rastreado
+#  - procura novos cantos quando a quantidade de pontos cai abaixo de `min_points`, apenas nas regiões ainda não
+#    cobertas (os pontos existentes são mascarados com um raio de `min_distance`)
+#  - opcionalmente descarta os pontos inconsistentes (`track_points`): pelo erro de ida e volta do Lucas-Kanade
+#    (forward-backward) e pelo percentil do erro devolvido pelo `calcOpticalFlowPyrLK`
+#  - converte cada frame para escala de cinza uma única vez (ou usa a do `FrameContext`) e o reaproveita como frame
+#    anterior no par seguinte
+#
+# Observação: em C++ a pirâmide de cada frame poderia ser construída uma única vez com `cv2.buildOpticalFlowPyramid` e
+# passada ao `calcOpticalFlowPyrLK`, mas os bindings Python não aceitam a lista de níveis no lugar da imagem, então o
+# Lucas-Kanade reconstrói as pirâmides internamente a cada chamada.
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+import cv2
+import numpy as np
+
+from rastreamento.frame_context import FrameContext
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Rastrear pontos entre dois frames
+
+# Roda o Lucas-Kanade de `prev_gray` para `gray` com todos os `points` (Nx2) em uma única chamada e retorna
+# (novos pontos Nx2, máscara dos pontos aceitos). Além do `status`, os pontos podem ser rejeitados:
+#  - `error_percentile`: erro (saída `err` do LK) acima desse percentil dos erros dos pontos válidos
+#  - `fb_threshold`: distância, em pixels, entre o ponto original e o ponto rastreado de volta de `gray` para
+#    `prev_gray`. A volta roda em uma única chamada só com os pontos ainda aceitos, partindo das posições originais
+#    (`cv2.OPTFLOW_USE_INITIAL_FLOW`), o que reduz as iterações para os pontos consistentes.
+# `lk_params` são os argumentos do `cv2.calcOpticalFlowPyrLK` (winSize, maxLevel, criteria).
+def track_points(prev_gray, gray, points, fb_threshold=None, error_percentile=None, **lk_params):
+    points = np.asarray(points, dtype=np.float32).reshape(-1, 1, 2)
+    if len(points) == 0:
+        return points.reshape(-1, 2), np.empty(0, dtype=bool)
+    new_points, status, errors = cv2.calcOpticalFlowPyrLK(prev_gray, gray, points, None, **lk_params)
+    keep = status.reshape(-1) == 1
+
+    if error_percentile is not None and keep.any():
+        errors = errors.reshape(-1)
+        keep &= errors <= np.percentile(errors[keep], error_percentile)
+
+    if fb_threshold is not None and keep.any():
+        idx = np.flatnonzero(keep)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, prev_gray, new_points[idx], points[idx].copy(),
+                                                        flags=cv2.OPTFLOW_USE_INITIAL_FLOW, **lk_params)
+        distance = np.linalg.norm((back - points[idx]).reshape(-1, 2), axis=1)
+        keep[idx] = (back_status.reshape(-1) == 1) & (distance <= fb_threshold)
+
+    return new_points.reshape(-1, 2), keep
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Rastreador de pontos
+
+class SparseFlowTracker:
+
+    # `max_corners`, `quality_level`, `min_distance` e `block_size` são os parâmetros do `cv2.goodFeaturesToTrack`;
+    # `win_size`, `max_level` e `criteria` os do `cv2.calcOpticalFlowPyrLK`. `min_points` é a quantidade abaixo da
+    # qual novos cantos são procurados (padrão: metade de `max_corners`; 0 desativa a busca, para rastrear apenas os
+    # pontos passados a `add()`, como em uma sessão de cliques). `fb_threshold` e `error_percentile` ativam
+    # os filtros de consistência de `track_points` (None = desativado).
+    def __init__(self, max_corners=100, min_points=None, quality_level=0.3, min_distance=7, block_size=7,
+                 win_size=(15, 15), max_level=2,
+                 criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03),
+                 fb_threshold=None, error_percentile=None):
+        self.max_corners = max_corners
+        self.min_points = max_corners // 2 if min_points is None else min_points
+        self.feature_params = dict(qualityLevel=quality_level, minDistance=min_distance, blockSize=block_size)
+        self.min_distance = min_distance
+        self.lk_params = dict(winSize=tuple(win_size), maxLevel=max_level, criteria=criteria)
+        self.fb_threshold = fb_threshold
+        self.error_percentile = error_percentile
+        self._next_id = 0
+        self.reset()
+
+    # Esquece todos os pontos e o frame anterior
+    def reset(self):
+        self._prev_gray = None
+        # Ids e posições (Nx2, float32) dos pontos rastreados, e a posição de cada um no frame anterior
+        self.ids = np.empty(0, dtype=np.int64)
+        self.points = np.empty((0, 2), dtype=np.float32)
+        self.prev_points = np.empty((0, 2), dtype=np.float32)
+        # Ids perdidos e criados na última atualização
+        self.lost = np.empty(0, dtype=np.int64)
+        self.added = np.empty(0, dtype=np.int64)
+
+    # Procura novos cantos fora da vizinhança dos pontos atuais, até completar `max_corners`
+    def _replenish(self, gray):
+        wanted = self.max_corners - len(self.points)
+        if wanted <= 0:
+            return
+        mask = np.full(gray.shape, 255, dtype=np.uint8)
+        for x, y in self.points:
+            cv2.circle(mask, (int(x), int(y)), self.min_distance, 0, -1)
+        corners = cv2.goodFeaturesToTrack(gray, maxCorners=wanted, mask=mask, **self.feature_params)
+        if corners is None:
+            return
+
+        self.added = self.add(corners)
+
+    # Adiciona pontos (Nx2) nas coordenadas do último frame passado a `update()` (ou do próximo, antes do primeiro)
+    # e retorna os ids atribuídos. Todos os pontos são rastreados juntos, em uma única chamada por frame.
+    def add(self, points):
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        new_ids = np.arange(self._next_id, self._next_id + len(points), dtype=np.int64)
+        self._next_id += len(points)
+        self.ids = np.concatenate([self.ids, new_ids])
+        self.points = np.concatenate([self.points, points])
+        self.prev_points = np.concatenate([self.prev_points, points])
+        return new_ids
+
+    # Remove os pontos com os ids informados
+    def remove(self, ids):
+        keep = ~np.isin(self.ids, np.asarray(ids, dtype=np.int64))
+        self.ids = self.ids[keep]
+        self.points = self.points[keep]
+        self.prev_points = self.prev_points[keep]
+
+    # Id do ponto mais próximo de (x, y) a até `radius` pixels, ou None
+    def nearest(self, x, y, radius=10):
+        if len(self.points) == 0:
+            return None
+        distances = np.hypot(self.points[:, 0] - x, self.points[:, 1] - y)
+        idx = int(np.argmin(distances))
+        return int(self.ids[idx]) if distances[idx] <= radius else None
+
+    # Remove os pontos em que `keep` é falso, registrando os ids perdidos
+    def _keep(self, keep, new_points):
+        self.lost = self.ids[~keep]
+        self.ids = self.ids[keep]
+        self.prev_points = self.points[keep]
+        self.points = new_points[keep]
+
+    # Rastreia os pontos até `frame` (imagem BGR, escala de cinza ou `FrameContext`) e repõe os perdidos.
+    # Retorna (ids, pontos) após a atualização.
+    def update(self, frame):
+        if isinstance(frame, FrameContext):
+            gray = frame.gray
+        else:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+        self.lost = np.empty(0, dtype=np.int64)
+        self.added = np.empty(0, dtype=np.int64)
+        if self._prev_gray is not None and len(self.points):
+            new_points, keep = track_points(self._prev_gray, gray, self.points, self.fb_threshold,
+                                            self.error_percentile, **self.lk_params)
+            # Pontos que saíram do frame também são descartados
+            height, width = gray.shape
+            inside = ((new_points[:, 0] >= 0) & (new_points[:, 0] < width) &
+                      (new_points[:, 1] >= 0) & (new_points[:, 1] < height))
+            self._keep(keep & inside, new_points)
+        else:
+            self.prev_points = self.points
+
+        if len(self.points) < self.min_points:
+            self._replenish(gray)
+
+        self._prev_gray = gray
+        return self.ids, self.points
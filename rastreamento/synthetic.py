@@ -0,0 +1,60 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Sequências sintéticas com um objeto em movimento
+
+# Gera vídeos artificiais com gabarito conhecido, para medir rastreadores sem depender de vídeos externos nem de GPU.
+# O objeto é um retângulo com textura aleatória que percorre uma curva de Lissajous sobre um fundo também texturizado,
+# variando levemente de tamanho. A mesma semente sempre gera a mesma sequência.
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+import cv2
+import numpy as np
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Gerar uma sequência
+
+# Retorna (frames, boxes): `frames` é uma lista de imagens BGR `size` = (largura, altura) e `boxes` a caixa (x, y, w, h)
+# verdadeira do objeto em cada frame. `object_size` é o tamanho inicial do objeto, `scale_amplitude` a variação
+# relativa de tamanho ao longo da sequência e `noise` o desvio padrão do ruído gaussiano somado a cada frame.
+def moving_object_sequence(n_frames=300, size=(640, 480), object_size=(60, 90), seed=0,
+                           scale_amplitude=0.2, noise=4.0):
+    frames, boxes = [], []
+    for frame, box in iter_moving_object_sequence(n_frames, size, object_size, seed, scale_amplitude, noise):
+        frames.append(frame)
+        boxes.append(box)
+    return frames, boxes
+
+
+# Mesma sequência de `moving_object_sequence()`, gerada sob demanda: produz um par (frame, box) por vez, então apenas
+# o frame atual fica em memória
+def iter_moving_object_sequence(n_frames=300, size=(640, 480), object_size=(60, 90), seed=0,
+                                scale_amplitude=0.2, noise=4.0):
+    rng = np.random.default_rng(seed)
+    width, height = size
+    obj_w, obj_h = object_size
+
+    # Fundo suave (ruído de baixa frequência ampliado) e textura do objeto com cores mais saturadas
+    background = cv2.resize(rng.integers(0, 256, (height // 16 + 1, width // 16 + 1, 3), dtype=np.uint8),
+                            (width, height), interpolation=cv2.INTER_CUBIC)
+    texture = cv2.resize(rng.integers(0, 256, (8, 8, 3), dtype=np.uint8),
+                         (obj_w * 2, obj_h * 2), interpolation=cv2.INTER_NEAREST)
+
+    # Parâmetros da trajetória
+    freq_x, freq_y = rng.uniform(1.0, 2.0), rng.uniform(1.0, 2.0)
+    phase = rng.uniform(0, 2 * np.pi)
+    margin_x, margin_y = obj_w * (1 + scale_amplitude), obj_h * (1 + scale_amplitude)
+
+    for i in range(n_frames):
+        t = i / max(n_frames - 1, 1)
+        scale = 1.0 + scale_amplitude * np.sin(2 * np.pi * t)
+        w, h = int(round(obj_w * scale)), int(round(obj_h * scale))
+        cx = width / 2 + (width / 2 - margin_x) * np.sin(2 * np.pi * freq_x * t + phase)
+        cy = height / 2 + (height / 2 - margin_y) * np.sin(2 * np.pi * freq_y * t)
+        x, y = int(round(cx - w / 2)), int(round(cy - h / 2))
+
+        frame = background.copy()
+        frame[y:y + h, x:x + w] = cv2.resize(texture, (w, h), interpolation=cv2.INTER_LINEAR)
+        if noise > 0:
+            frame = cv2.add(frame, rng.normal(0, noise, frame.shape).astype(np.int8), dtype=cv2.CV_8U)
+
+        yield frame, (x, y, w, h)
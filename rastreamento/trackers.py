@@ -0,0 +1,123 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Registro dos rastreadores do OpenCV
+
+# Antes, cada script escolhia o construtor com uma cadeia de `if` própria, decidindo entre `cv2` e `cv2.legacy`
+# a partir de `cv2.__version__`. Este módulo concentra essa escolha: para cada tipo de rastreador há uma lista de
+# construtores candidatos, na ordem de preferência, e o primeiro que existir na instalação do OpenCV é resolvido
+# uma única vez e guardado em cache.
+#
+# Cada tipo também tem um custo e uma precisão relativos (1 = menor, 5 = maior), usados por `cheapest_tracker()`
+# para escolher o rastreador mais barato que atende a um requisito de precisão. Os valores são uma ordenação
+# aproximada entre os rastreadores, não medições; para números medidos na sua máquina use
+# `7_Benchmark/benchmark_trackers.py`.
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+from functools import lru_cache
+
+import cv2
+
+from rastreamento.goturn import create_goturn
+
+
+class TrackerSpec:
+
+    # `constructors` são pares (módulo, nome do construtor), por exemplo ('legacy', 'TrackerMOSSE_create');
+    # o módulo `None` representa o próprio `cv2`.
+    def __init__(self, name, constructors, cost, accuracy):
+        self.name = name
+        self.constructors = constructors
+        self.cost = cost
+        self.accuracy = accuracy
+
+    def __repr__(self):
+        return 'TrackerSpec({!r}, cost={}, accuracy={})'.format(self.name, self.cost, self.accuracy)
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Tipos de rastreadores
+
+# A API nova (`cv2.TrackerX_create`) é preferida quando existe; os demais tipos só estão disponíveis em
+# `cv2.legacy` (pacote opencv-contrib-python). O GOTURN exige os arquivos `goturn.prototxt` e
+# `goturn.caffemodel` no diretório de trabalho no momento da criação; a rede é carregada uma única vez e
+# compartilhada por todos os rastreadores GOTURN (rastreamento/goturn.py).
+TRACKERS = {
+    'BOOSTING':   TrackerSpec('BOOSTING',   [('legacy', 'TrackerBoosting_create')], cost=3, accuracy=2),
+    'MIL':        TrackerSpec('MIL',        [(None, 'TrackerMIL_create'), ('legacy', 'TrackerMIL_create')], cost=3, accuracy=3),
+    'KCF':        TrackerSpec('KCF',        [(None, 'TrackerKCF_create'), ('legacy', 'TrackerKCF_create')], cost=2, accuracy=3),
+    'TLD':        TrackerSpec('TLD',        [('legacy', 'TrackerTLD_create')], cost=4, accuracy=2),
+    'MEDIANFLOW': TrackerSpec('MEDIANFLOW', [('legacy', 'TrackerMedianFlow_create')], cost=1, accuracy=2),
+    'MOSSE':      TrackerSpec('MOSSE',      [('legacy', 'TrackerMOSSE_create')], cost=1, accuracy=1),
+    'CSRT':       TrackerSpec('CSRT',       [(None, 'TrackerCSRT_create'), ('legacy', 'TrackerCSRT_create')], cost=4, accuracy=5),
+    'GOTURN':     TrackerSpec('GOTURN',     [(None, 'TrackerGOTURN_create')], cost=5, accuracy=4),
+}
+
+tracker_types = list(TRACKERS)
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Resolver o construtor de um tipo de rastreador
+
+# Retorna a especificação de `name` ou gera `ValueError` listando os tipos conhecidos
+def get_spec(name):
+    try:
+        return TRACKERS[name.upper()]
+    except KeyError:
+        raise ValueError('Rastreador desconhecido: {!r}. Os rastreadores disponíveis são: {}'.format(
+            name, ', '.join(tracker_types))) from None
+
+
+# Procura o primeiro construtor candidato que existe nesta instalação do OpenCV. O resultado fica em cache,
+# então a busca é feita uma vez por tipo. Gera `RuntimeError` quando o tipo não existe na instalação.
+@lru_cache(maxsize=None)
+def resolve_constructor(name):
+    spec = get_spec(name)
+    for module_name, constructor_name in spec.constructors:
+        module = cv2 if module_name is None else getattr(cv2, module_name, None)
+        constructor = getattr(module, constructor_name, None)
+        if constructor is not None:
+            return constructor
+
+    candidates = ', '.join('cv2.{}'.format(n) if m is None else 'cv2.{}.{}'.format(m, n) for m, n in spec.constructors)
+    raise RuntimeError('O rastreador {} não está disponível no OpenCV {} (procurado em: {}). '
+                       'Instale o pacote opencv-contrib-python.'.format(spec.name, cv2.__version__, candidates))
+
+
+# Verifica se o tipo `name` pode ser criado nesta instalação
+def is_available(name):
+    try:
+        resolve_constructor(name)
+    except RuntimeError:
+        return False
+    return True
+
+
+# Tipos que podem ser criados nesta instalação, na ordem de `tracker_types`
+def available_trackers():
+    return [name for name in tracker_types if is_available(name)]
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Criar um rastreador pelo nome
+
+# Substitui a antiga `createTrackerByName()` de `multi_tracking.py` e a cadeia de `if` de `single_tracking.py`.
+# O GOTURN é criado a partir da rede compartilhada, e não com o construtor resolvido.
+def create_tracker(name):
+    constructor = resolve_constructor(name)
+    if get_spec(name).name == 'GOTURN':
+        return create_goturn()
+    return constructor()
+
+
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Escolher o rastreador mais barato
+
+# Retorna o nome do rastreador disponível de menor custo com precisão de pelo menos `min_accuracy`
+# e custo de no máximo `max_cost`. Em caso de empate no custo, o mais preciso é escolhido.
+# Gera `RuntimeError` quando nenhum rastreador disponível atende aos requisitos.
+def cheapest_tracker(min_accuracy=1, max_cost=None, names=None):
+    names = available_trackers() if names is None else [get_spec(n).name for n in names if is_available(n)]
+    candidates = [TRACKERS[n] for n in names
+                  if TRACKERS[n].accuracy >= min_accuracy and (max_cost is None or TRACKERS[n].cost <= max_cost)]
+    if not candidates:
+        raise RuntimeError('Nenhum rastreador disponível com precisão >= {} e custo <= {}'.format(min_accuracy, max_cost))
+    return min(candidates, key=lambda spec: (spec.cost, -spec.accuracy)).name
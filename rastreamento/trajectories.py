@@ -0,0 +1,122 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Armazenamento das trajetórias dos pontos rastreados
+
+# Os scripts de optical flow esparso desenhavam os rastros com `cv2.line` em uma máscara do tamanho do frame que nunca
+# era limpa e somavam a máscara ao frame (`cv2.add`) a cada quadro: custo de uma soma do frame inteiro por quadro e um
+# histórico que não podia ser consultado.
+#
+# A classe `TrajectoryStore` guarda as últimas `length` posições de cada ponto em um único array NumPy
+# (pontos x `length` x 2), usado como buffer circular: a coluna do quadro atual é sobrescrita a cada atualização. A
+# memória depende apenas da quantidade de pontos ativos e de `length`, e o desenho dos últimos K passos é feito com
+# `cv2.polylines` sobre as posições de todos os pontos, obtidas de uma vez do buffer.
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+import cv2
+import numpy as np
+
+
+class TrajectoryStore:
+
+    # `length` é a quantidade de posições guardadas por ponto e `capacity` a quantidade inicial de pontos
+    # simultâneos (o buffer dobra de tamanho quando necessário)
+    def __init__(self, length=32, capacity=128):
+        if length < 2:
+            raise ValueError('length deve ser pelo menos 2: {}'.format(length))
+        self.length = length
+        self.frame_idx = -1
+        self._positions = np.full((capacity, length, 2), np.nan, dtype=np.float32)
+        self._slot_ids = np.full(capacity, -1, dtype=np.int64)
+        self._slots = {}
+        # Índice do quadro guardado em cada coluna do buffer
+        self._frames = np.full(length, -1, dtype=np.int64)
+
+    def __len__(self):
+        return len(self._slots)
+
+    # Ids dos pontos com trajetória ativa
+    @property
+    def ids(self):
+        return self._slot_ids[self._slot_ids >= 0]
+
+    def _grow(self, needed):
+        capacity = len(self._slot_ids)
+        while capacity < needed:
+            capacity *= 2
+        extra = capacity - len(self._slot_ids)
+        self._positions = np.concatenate(
+            [self._positions, np.full((extra, self.length, 2), np.nan, dtype=np.float32)])
+        self._slot_ids = np.concatenate([self._slot_ids, np.full(extra, -1, dtype=np.int64)])
+
+    # Registra as posições `points` (Nx2) dos pontos `ids` no próximo quadro. Os pontos ausentes de `ids` têm a
+    # trajetória encerrada e a posição no buffer liberada para novos pontos.
+    def update(self, ids, points):
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        self.frame_idx += 1
+        column = self.frame_idx % self.length
+        self._frames[column] = self.frame_idx
+
+        present = set(ids.tolist())
+        for point_id in [i for i in self._slots if i not in present]:
+            self._slot_ids[self._slots.pop(point_id)] = -1
+
+        new_ids = [i for i in ids.tolist() if i not in self._slots]
+        if new_ids:
+            if len(self._slots) + len(new_ids) > len(self._slot_ids):
+                self._grow(len(self._slots) + len(new_ids))
+            free = np.flatnonzero(self._slot_ids < 0)[:len(new_ids)]
+            self._positions[free] = np.nan
+            self._slot_ids[free] = new_ids
+            self._slots.update(zip(new_ids, free.tolist()))
+
+        slots = np.fromiter((self._slots[i] for i in ids.tolist()), dtype=np.int64, count=len(ids))
+        self._positions[:, column] = np.nan
+        self._positions[slots, column] = points
+
+    # Colunas do buffer dos últimos `steps` quadros, da mais antiga para a mais recente
+    def _columns(self, steps=None):
+        steps = self.length if steps is None else min(steps, self.length)
+        steps = min(steps, self.frame_idx + 1)
+        return (self.frame_idx - np.arange(steps)[::-1]) % self.length
+
+    # Retorna (quadros, posições Nx2) da trajetória guardada do ponto `point_id`
+    def trajectory(self, point_id):
+        columns = self._columns()
+        positions = self._positions[self._slots[point_id], columns]
+        valid = ~np.isnan(positions[:, 0])
+        return self._frames[columns][valid], positions[valid]
+
+    # Desenha em `image` os últimos `steps` passos de cada trajetória ativa. `colors` é uma paleta (Mx3) indexada por
+    # `id % M`; sem ela, todas as trajetórias usam `color`. Os pontos de mesma cor são desenhados em uma única chamada.
+    def render(self, image, steps=None, colors=None, color=(0, 255, 255), thickness=2):
+        active = np.flatnonzero(self._slot_ids >= 0)
+        if len(active) == 0 or self.frame_idx < 1:
+            return image
+
+        trails = self._positions[active][:, self._columns(steps)]
+        # Como um ponto só é rastreado enquanto não se perde, as posições válidas de cada trilha são as últimas
+        counts = (~np.isnan(trails[..., 0])).sum(axis=1)
+        trails = np.rint(np.nan_to_num(trails)).astype(np.int32)
+        keep = counts >= 2
+        polylines = [trail[-count:] for trail, count in zip(trails[keep], counts[keep])]
+        if not polylines:
+            return image
+
+        if colors is None:
+            return cv2.polylines(image, polylines, False, color, thickness)
+        groups = self._slot_ids[active][keep] % len(colors)
+        for group in np.unique(groups):
+            cv2.polylines(image, [polylines[i] for i in np.flatnonzero(groups == group)], False,
+                          colors[group].tolist(), thickness)
+        return image
+
+    # Grava em CSV (`point_id,frame_idx,x,y`) as posições guardadas de todas as trajetórias ativas
+    def save(self, path):
+        columns = self._columns()
+        active = np.flatnonzero(self._slot_ids >= 0)
+        positions = self._positions[active][:, columns]
+        slot_idx, step_idx = np.nonzero(~np.isnan(positions[..., 0]))
+        records = np.column_stack([self._slot_ids[active][slot_idx], self._frames[columns][step_idx],
+                                   positions[slot_idx, step_idx]])
+        np.savetxt(path, records, fmt=['%d', '%d', '%.2f', '%.2f'], delimiter=',',
+                   header='point_id,frame_idx,x,y', comments='')
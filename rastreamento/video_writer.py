@@ -0,0 +1,120 @@
+# -------------------------------------------------------------------------------------------------------------------------------#
+# Gravação de vídeo em uma thread separada
+
+# Os scripts desenham as caixas e os textos em cada frame e só exibem o resultado com `cv2.imshow`, sem como gravá-lo.
+# Gravar com `cv2.VideoWriter.write()` no próprio laço somaria o tempo de codificação à latência de cada frame. A classe
+# `AsyncVideoWriter` codifica os frames anotados em uma thread de fundo, alimentada por uma fila limitada, enquanto a
+# thread principal continua rastreando. Como o OpenCV libera o GIL durante a codificação, a gravação roda em paralelo
+# com o rastreador.
+#
+# Para que a gravação nunca segure o laço de rastreamento:
+#  - com `drop=True`, quando a fila está cheia (codificação mais lenta que o rastreamento) o frame novo é descartado
+#    em vez de esperar; a quantidade descartada fica em `dropped`
+#  - com `every=N`, apenas um de cada N frames é gravado (a taxa do vídeo de saída é ajustada para manter a duração)
+#
+# A classe tem a mesma interface de gravação do `cv2.VideoWriter` (`write()`, `isOpened()` e `release()`):
+#   writer = AsyncVideoWriter('saida.mp4', fps=30, every=2)
+# -------------------------------------------------------------------------------------------------------------------------------#
+
+import queue
+import threading
+
+import cv2
+
+# Marcador colocado na fila para encerrar a thread de gravação
+_END = object()
+
+
+class AsyncVideoWriter:
+
+    # `path` é o arquivo de saída, `fps` a taxa de quadros do vídeo de entrada e `fourcc` o código do codec.
+    # `frame_size` (largura, altura) abre o arquivo imediatamente; sem ele, o tamanho é o do primeiro frame gravado.
+    # `depth` é a quantidade máxima de frames esperando codificação. Com `drop=False` o `write()` espera espaço na
+    # fila e nenhum frame é perdido. `every` grava apenas um de cada `every` frames.
+    def __init__(self, path, fps=30.0, fourcc='mp4v', frame_size=None, depth=32, drop=True, every=1):
+        if depth < 1:
+            raise ValueError('depth deve ser maior ou igual a 1')
+        if every < 1:
+            raise ValueError('every deve ser maior ou igual a 1')
+
+        self.path = path
+        self.fps = fps / every
+        self.fourcc = fourcc
+        self.drop = drop
+        self.every = every
+        self.frame_size = None
+        self.written = 0
+        self.dropped = 0
+        self.skipped = 0
+
+        self._writer = None
+        self._frames = 0
+        self._closed = False
+        self._queue = queue.Queue(maxsize=depth)
+        self._thread = None
+        if frame_size is not None:
+            self._open(frame_size)
+
+    # Abre o arquivo e inicia a thread de gravação. Gera `IOError` quando o OpenCV não consegue criar o arquivo.
+    def _open(self, frame_size):
+        self.frame_size = tuple(int(v) for v in frame_size)
+        self._writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, self.frame_size)
+        if not self._writer.isOpened():
+            raise IOError('Não foi possível criar o vídeo de saída: {}'.format(self.path))
+        self._thread = threading.Thread(target=self._run, name='AsyncVideoWriter', daemon=True)
+        self._thread.start()
+
+    # Laço da thread de gravação
+    def _run(self):
+        while True:
+            frame = self._queue.get()
+            if frame is _END:
+                break
+            self._writer.write(frame)
+            self.written += 1
+
+    def isOpened(self):
+        return self._writer is not None and not self._closed
+
+    # Envia `frame` para gravação e retorna se ele foi enfileirado. O frame não é copiado: ele não deve ser alterado
+    # depois desta chamada (passe uma cópia se o mesmo array for reaproveitado no quadro seguinte).
+    def write(self, frame):
+        if self._closed:
+            raise RuntimeError('O vídeo de saída já foi fechado: {}'.format(self.path))
+
+        self._frames += 1
+        if (self._frames - 1) % self.every:
+            self.skipped += 1
+            return False
+
+        size = (frame.shape[1], frame.shape[0])
+        if self._writer is None:
+            self._open(size)
+        elif size != self.frame_size:
+            raise ValueError('Frame de tamanho {} diferente do vídeo de saída {}'.format(size, self.frame_size))
+
+        if not self.drop:
+            self._queue.put(frame)
+            return True
+        try:
+            self._queue.put_nowait(frame)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    # Espera a gravação dos frames que ainda estão na fila e fecha o arquivo
+    def release(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer is not None:
+            self._queue.put(_END)
+            self._thread.join()
+            self._writer.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()